@@ -214,7 +214,7 @@ class Project5001CLI:
         try:
             # Find harvester processes (cross-platform)
             harvester_processes = []
-            for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
+            for proc in psutil.process_iter(['pid', 'cmdline']):
                 try:
                     if 'harvester_v2.py' in ' '.join(proc.info['cmdline'] or []):
                         harvester_processes.append(proc)
@@ -225,11 +225,21 @@ class Project5001CLI:
                 for proc in harvester_processes:
                     try:
                         proc.terminate()  # Graceful termination
-                        proc.wait(timeout=5)  # Wait up to 5 seconds
-                        print(f"✅ Stopped harvester process {proc.pid}")
-                    except psutil.TimeoutExpired:
+                    except psutil.NoSuchProcess:
+                        pass
+                    except Exception as e:
+                        print(f"⚠️  Could not stop process {proc.pid}: {e}")
+                
+                # Wait for all of them together, up to 5 seconds
+                gone, alive = psutil.wait_procs(harvester_processes, timeout=5)
+                for proc in gone:
+                    print(f"✅ Stopped harvester process {proc.pid}")
+                for proc in alive:
+                    try:
                         proc.kill()  # Force kill if needed
                         print(f"✅ Force stopped harvester process {proc.pid}")
+                    except psutil.NoSuchProcess:
+                        print(f"✅ Stopped harvester process {proc.pid}")
                     except Exception as e:
                         print(f"⚠️  Could not stop process {proc.pid}: {e}")
             else:
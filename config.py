@@ -11,6 +11,11 @@ from pathlib import Path
 from typing import Dict, Any, Optional
 from dotenv import load_dotenv
 
+try:
+    import orjson  # Optional: faster config parsing/serialisation
+except ImportError:
+    orjson = None
+
 # Load environment variables
 load_dotenv()
 
@@ -18,10 +23,11 @@ class NodeConfig:
     """Configuration management for different node types."""
     
     ROLES = ['main', 'secondary', 'mobile']
+    CONFIG_DIR = Path('./config')
     
     def __init__(self, role: str = None):
         self.role = role or os.getenv('NODE_ROLE', 'main')
-        self.config_dir = Path('./config')
+        self.config_dir = self.CONFIG_DIR
         self.config_dir.mkdir(exist_ok=True)
         
         # Load role-specific configuration
@@ -30,16 +36,32 @@ class NodeConfig:
         # Setup logging
         self.setup_logging()
     
+    @classmethod
+    def config_path(cls, role: str) -> Path:
+        """Path of the saved configuration file for a role."""
+        return cls.CONFIG_DIR / f'{role}-node.json'
+    
+    @classmethod
+    def config_exists(cls, role: str = 'main') -> bool:
+        """Check whether a saved configuration exists for a role."""
+        try:
+            os.stat(cls.config_path(role))
+            return True
+        except FileNotFoundError:
+            return False
+    
     def load_config(self) -> Dict[str, Any]:
         """Load configuration for the current role."""
-        config_file = self.config_dir / f'{self.role}-node.json'
+        config_file = self.config_path(self.role)
         
-        if config_file.exists():
+        try:
+            if orjson:
+                return orjson.loads(config_file.read_bytes())
             with open(config_file, 'r') as f:
                 return json.load(f)
-        
-        # Return default configuration
-        return self.get_default_config()
+        except FileNotFoundError:
+            # Return default configuration
+            return self.get_default_config()
     
     def get_default_config(self) -> Dict[str, Any]:
         """Get default configuration for the current role."""
@@ -53,6 +75,7 @@ class NodeConfig:
             'audio_format': 'mp3',
             'audio_quality': '256k',
             'check_interval': 3600,  # 1 hour
+            'feed_poll_interval': 300,  # playlist feed checks between full cycles
             'max_retries': 3,
             'retry_delay': 60,
             'rate_limit_cooldown': 300,  # 5 minutes
@@ -74,6 +97,7 @@ class NodeConfig:
                 'rotation_enabled': True,
                 'max_concurrent_downloads': 3,
                 'download_delay': 2,  # seconds between downloads
+                'concurrent_fragments': 4,  # parallel connections per download
                 'syncthing': {
                     'enabled': True,
                     'api_url': 'http://localhost:8384',
@@ -118,10 +142,13 @@ class NodeConfig:
     
     def save_config(self):
         """Save current configuration to file."""
-        config_file = self.config_dir / f'{self.role}-node.json'
+        config_file = self.config_path(self.role)
         
-        with open(config_file, 'w') as f:
-            json.dump(self.config, f, indent=2)
+        if orjson:
+            config_file.write_bytes(orjson.dumps(self.config, option=orjson.OPT_INDENT_2))
+        else:
+            with open(config_file, 'w') as f:
+                json.dump(self.config, f, indent=2)
         
         logging.info(f"Configuration saved to {config_file}")
     
@@ -4,12 +4,16 @@ Project 5001 - Database Management
 Handles SQLite database for tracking videos, sync status, and device rotation.
 """
 
+import re
 import sqlite3
 import json
 import logging
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple
+from typing import Callable, List, Dict, Optional, Tuple
 from config import NodeConfig
 
 class Project5001Database:
@@ -20,107 +24,207 @@ class Project5001Database:
         self.db_path = Path(config.get('database_file'))
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
         
+        # One connection for the whole process; the lock serialises access
+        # from the download worker threads.
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._configure_connection()
+        
         self.init_database()
     
+    def _configure_connection(self):
+        """Put the shared connection into WAL mode."""
+        for pragma in ('PRAGMA journal_mode=WAL',
+                       'PRAGMA synchronous=NORMAL',
+                       'PRAGMA temp_store=MEMORY'):
+            try:
+                self._conn.execute(pragma)
+            except sqlite3.Error as e:
+                logging.warning(f"Could not apply '{pragma}': {e}")
+    
+    @contextmanager
+    def _cursor(self):
+        """Yield a cursor on the shared connection, committing on success."""
+        with self._lock:
+            cursor = self._conn.cursor()
+            try:
+                yield cursor
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+            finally:
+                cursor.close()
+    
+    def close(self):
+        """Close the shared database connection."""
+        with self._lock:
+            self._conn.close()
+    
     def init_database(self):
         """Initialize database tables."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Videos table - tracks all harvested videos
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS videos (
-                id TEXT PRIMARY KEY,
-                title TEXT NOT NULL,
-                artist TEXT,
-                filename TEXT,
-                playlist_url TEXT,
-                file_size INTEGER,
-                duration INTEGER,
-                quality TEXT,
-                download_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                last_modified TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Sync status table - tracks sync across devices
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS sync_status (
-                device_id TEXT,
-                video_id TEXT,
-                sync_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                status TEXT DEFAULT 'pending',
-                file_path TEXT,
-                PRIMARY KEY (device_id, video_id),
-                FOREIGN KEY (video_id) REFERENCES videos (id)
-            )
-        ''')
-        
-        # Device rotation table - tracks download device rotation
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS device_rotation (
-                device_id TEXT PRIMARY KEY,
-                device_name TEXT,
-                device_type TEXT,
-                is_active BOOLEAN DEFAULT 1,
-                last_used TIMESTAMP,
-                rate_limit_count INTEGER DEFAULT 0,
-                last_rate_limit TIMESTAMP,
-                cooldown_until TIMESTAMP,
-                success_count INTEGER DEFAULT 0,
-                failure_count INTEGER DEFAULT 0
-            )
-        ''')
+        with self._cursor() as cursor:
+            # Videos table - tracks all harvested videos
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS videos (
+                    id TEXT PRIMARY KEY,
+                    title TEXT NOT NULL,
+                    artist TEXT,
+                    filename TEXT,
+                    playlist_url TEXT,
+                    file_size INTEGER,
+                    duration INTEGER,
+                    quality TEXT,
+                    download_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    last_modified TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                ) WITHOUT ROWID
+            ''')
+            
+            # Sync status table - tracks sync across devices
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS sync_status (
+                    device_id TEXT,
+                    video_id TEXT,
+                    sync_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    status TEXT DEFAULT 'pending',
+                    file_path TEXT,
+                    PRIMARY KEY (device_id, video_id),
+                    FOREIGN KEY (video_id) REFERENCES videos (id)
+                )
+            ''')
+            
+            # Device rotation table - tracks download device rotation
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS device_rotation (
+                    device_id TEXT PRIMARY KEY,
+                    device_name TEXT,
+                    device_type TEXT,
+                    is_active BOOLEAN DEFAULT 1,
+                    last_used INTEGER,  -- Unix epoch seconds
+                    rate_limit_count INTEGER DEFAULT 0,
+                    last_rate_limit TIMESTAMP,
+                    cooldown_until INTEGER,  -- Unix epoch seconds
+                    success_count INTEGER DEFAULT 0,
+                    failure_count INTEGER DEFAULT 0
+                )
+            ''')
+            
+            # Download history table - tracks download attempts
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS download_history (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    video_id TEXT,
+                    device_id TEXT,
+                    attempt_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    status TEXT,
+                    error_message TEXT,
+                    download_speed REAL,
+                    file_size INTEGER,
+                    FOREIGN KEY (video_id) REFERENCES videos (id)
+                )
+            ''')
+            
+            # Small key/value store for persistent counters
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS meta (
+                    key TEXT PRIMARY KEY,
+                    value INTEGER
+                )
+            ''')
+            
+            # Rate limiting events table
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS rate_limit_events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    device_id TEXT,
+                    event_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    event_type TEXT,
+                    details TEXT,
+                    resolved BOOLEAN DEFAULT 0
+                )
+            ''')
         
-        # Download history table - tracks download attempts
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS download_history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                video_id TEXT,
-                device_id TEXT,
-                attempt_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                status TEXT,
-                error_message TEXT,
-                download_speed REAL,
-                file_size INTEGER,
-                FOREIGN KEY (video_id) REFERENCES videos (id)
-            )
-        ''')
+        self._migrate_videos_without_rowid()
+        self._migrate_device_times_to_epoch()
+        self._ensure_video_indexes()
         
-        # Rate limiting events table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS rate_limit_events (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                device_id TEXT,
-                event_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                event_type TEXT,
-                details TEXT,
-                resolved BOOLEAN DEFAULT 0
-            )
-        ''')
+        logging.info("Database initialized successfully")
+    
+    def _migrate_videos_without_rowid(self):
+        """Rebuild a pre-existing rowid videos table as WITHOUT ROWID.
         
-        conn.commit()
-        conn.close()
+        Lookups by id then descend a single B-tree instead of going through
+        the separate primary key index and the rowid table.
+        """
+        with self._cursor() as cursor:
+            cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'videos'")
+            row = cursor.fetchone()
+            table_sql = row[0] if row else ''
+            if 'WITHOUT ROWID' in table_sql.upper() or 'PRIMARY KEY' not in table_sql.upper():
+                return
+            
+            cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = 'videos' AND sql IS NOT NULL")
+            index_sqls = [index_row[0] for index_row in cursor.fetchall()]
         
-        logging.info("Database initialized successfully")
+        try:
+            with self._cursor() as cursor:
+                cursor.execute('BEGIN')
+                # Keep this database's own column list; only the storage changes
+                new_sql = re.sub(r'^\s*CREATE TABLE\s+(IF NOT EXISTS\s+)?["`\[]?videos["`\]]?',
+                                 'CREATE TABLE videos_migrated', table_sql, count=1, flags=re.IGNORECASE)
+                cursor.execute(new_sql.rstrip().rstrip(';') + ' WITHOUT ROWID')
+                cursor.execute('INSERT INTO videos_migrated SELECT * FROM videos')
+                cursor.execute('DROP TABLE videos')
+                cursor.execute('ALTER TABLE videos_migrated RENAME TO videos')
+                for index_sql in index_sqls:
+                    cursor.execute(index_sql)
+            
+            logging.info("Migrated videos table to WITHOUT ROWID")
+        except sqlite3.Error as e:
+            logging.warning(f"Could not migrate videos table to WITHOUT ROWID: {e}")
+    
+    def _ensure_video_indexes(self):
+        """Create the date and artist indexes used by the status and playlist queries."""
+        try:
+            with self._cursor() as cursor:
+                cursor.execute('PRAGMA table_info(videos)')
+                columns = [row[1] for row in cursor.fetchall()]
+                # Legacy databases store the download time in a ts column
+                date_column = 'ts' if 'ts' in columns else 'download_date'
+                cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_videos_date ON videos({date_column})')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_videos_artist ON videos(artist)')
+        except sqlite3.Error as e:
+            logging.warning(f"Could not create video indexes: {e}")
+    
+    def _migrate_device_times_to_epoch(self):
+        """Convert ISO-8601 cooldown_until/last_used values (local time) to Unix epoch seconds."""
+        try:
+            with self._cursor() as cursor:
+                cursor.execute('''
+                    UPDATE device_rotation
+                    SET cooldown_until = CAST(strftime('%s', cooldown_until, 'utc') AS INTEGER)
+                    WHERE typeof(cooldown_until) = 'text'
+                ''')
+                cursor.execute('''
+                    UPDATE device_rotation
+                    SET last_used = CAST(strftime('%s', last_used, 'utc') AS INTEGER)
+                    WHERE typeof(last_used) = 'text'
+                ''')
+        except sqlite3.Error as e:
+            logging.warning(f"Could not migrate device timestamps: {e}")
     
     def add_video(self, video_id: str, title: str, artist: str, filename: str, 
                   playlist_url: str, file_size: int = None, duration: int = None, 
                   quality: str = None) -> bool:
         """Add a video to the database."""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT OR REPLACE INTO videos 
-                (id, title, artist, filename, playlist_url, file_size, duration, quality, last_modified)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (video_id, title, artist, filename, playlist_url, file_size, 
-                  duration, quality, datetime.now().isoformat()))
-            
-            conn.commit()
-            conn.close()
+            with self._cursor() as cursor:
+                cursor.execute('''
+                    INSERT OR REPLACE INTO videos 
+                    (id, title, artist, filename, playlist_url, file_size, duration, quality, last_modified)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (video_id, title, artist, filename, playlist_url, file_size, 
+                      duration, quality, datetime.now().isoformat()))
             
             logging.info(f"Added video to database: {title}")
             return True
@@ -129,20 +233,42 @@ class Project5001Database:
             logging.error(f"Failed to add video {video_id}: {e}")
             return False
     
+    def add_videos(self, rows: List[Tuple]) -> bool:
+        """Add several videos in one transaction.
+        
+        Each row is (video_id, title, artist, filename, playlist_url,
+        file_size, duration, quality), matching add_video's arguments.
+        """
+        if not rows:
+            return True
+        
+        try:
+            now = datetime.now().isoformat()
+            with self._cursor() as cursor:
+                cursor.executemany('''
+                    INSERT OR REPLACE INTO videos 
+                    (id, title, artist, filename, playlist_url, file_size, duration, quality, last_modified)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', [tuple(row) + (now,) for row in rows])
+            
+            logging.info(f"Added {len(rows)} videos to database")
+            return True
+            
+        except Exception as e:
+            logging.error(f"Failed to add {len(rows)} videos: {e}")
+            return False
+    
     def get_video(self, video_id: str) -> Optional[Dict]:
         """Get video information from database."""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT id, title, artist, filename, playlist_url, file_size, 
-                       duration, quality, download_date, last_modified
-                FROM videos WHERE id = ?
-            ''', (video_id,))
-            
-            row = cursor.fetchone()
-            conn.close()
+            with self._cursor() as cursor:
+                cursor.execute('''
+                    SELECT id, title, artist, filename, playlist_url, file_size, 
+                           duration, quality, download_date, last_modified
+                    FROM videos WHERE id = ?
+                ''', (video_id,))
+                
+                row = cursor.fetchone()
             
             if row:
                 return {
@@ -168,25 +294,40 @@ class Project5001Database:
         """Check if video exists in database."""
         return self.get_video(video_id) is not None
     
+    def get_unseen_ids(self, video_ids: List[str]) -> set:
+        """Return the subset of video_ids not yet in the videos table."""
+        try:
+            with self._cursor() as cursor:
+                cursor.execute('CREATE TEMP TABLE IF NOT EXISTS tmp_ids (id TEXT PRIMARY KEY)')
+                cursor.execute('DELETE FROM tmp_ids')
+                cursor.executemany('INSERT OR IGNORE INTO tmp_ids VALUES (?)',
+                                   ((video_id,) for video_id in video_ids))
+                cursor.execute('SELECT id FROM tmp_ids WHERE id NOT IN (SELECT id FROM videos)')
+                unseen = {row[0] for row in cursor.fetchall()}
+                cursor.execute('DELETE FROM tmp_ids')
+            
+            return unseen
+        
+        except Exception as e:
+            logging.error(f"Failed to filter unseen videos: {e}")
+            return {video_id for video_id in video_ids if not self.video_exists(video_id)}
+    
     def get_all_videos(self, limit: int = None) -> List[Dict]:
         """Get all videos from database."""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            query = '''
-                SELECT id, title, artist, filename, playlist_url, file_size, 
-                       duration, quality, download_date, last_modified
-                FROM videos 
-                ORDER BY download_date DESC
-            '''
-            
-            if limit:
-                query += f' LIMIT {limit}'
-            
-            cursor.execute(query)
-            rows = cursor.fetchall()
-            conn.close()
+            with self._cursor() as cursor:
+                query = '''
+                    SELECT id, title, artist, filename, playlist_url, file_size, 
+                           duration, quality, download_date, last_modified
+                    FROM videos 
+                    ORDER BY download_date DESC
+                '''
+                
+                if limit:
+                    query += f' LIMIT {limit}'
+                
+                cursor.execute(query)
+                rows = cursor.fetchall()
             
             return [{
                 'id': row[0],
@@ -208,21 +349,18 @@ class Project5001Database:
     def get_recent_videos(self, days: int = 7) -> List[Dict]:
         """Get videos added in the last N days."""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cutoff_date = (datetime.now() - timedelta(days=days)).isoformat()
-            
-            cursor.execute('''
-                SELECT id, title, artist, filename, playlist_url, file_size, 
-                       duration, quality, download_date, last_modified
-                FROM videos 
-                WHERE download_date >= ?
-                ORDER BY download_date DESC
-            ''', (cutoff_date,))
-            
-            rows = cursor.fetchall()
-            conn.close()
+            with self._cursor() as cursor:
+                cutoff_date = (datetime.now() - timedelta(days=days)).isoformat()
+                
+                cursor.execute('''
+                    SELECT id, title, artist, filename, playlist_url, file_size, 
+                           duration, quality, download_date, last_modified
+                    FROM videos 
+                    WHERE download_date >= ?
+                    ORDER BY download_date DESC
+                ''', (cutoff_date,))
+                
+                rows = cursor.fetchall()
             
             return [{
                 'id': row[0],
@@ -245,17 +383,12 @@ class Project5001Database:
                           file_path: str = None) -> bool:
         """Update sync status for a device and video."""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT OR REPLACE INTO sync_status 
-                (device_id, video_id, sync_date, status, file_path)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (device_id, video_id, datetime.now().isoformat(), status, file_path))
-            
-            conn.commit()
-            conn.close()
+            with self._cursor() as cursor:
+                cursor.execute('''
+                    INSERT OR REPLACE INTO sync_status 
+                    (device_id, video_id, sync_date, status, file_path)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (device_id, video_id, datetime.now().isoformat(), status, file_path))
             
             return True
             
@@ -266,29 +399,26 @@ class Project5001Database:
     def get_sync_status(self, device_id: str = None, video_id: str = None) -> List[Dict]:
         """Get sync status information."""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            query = '''
-                SELECT device_id, video_id, sync_date, status, file_path
-                FROM sync_status
-                WHERE 1=1
-            '''
-            params = []
-            
-            if device_id:
-                query += ' AND device_id = ?'
-                params.append(device_id)
-            
-            if video_id:
-                query += ' AND video_id = ?'
-                params.append(video_id)
-            
-            query += ' ORDER BY sync_date DESC'
-            
-            cursor.execute(query, params)
-            rows = cursor.fetchall()
-            conn.close()
+            with self._cursor() as cursor:
+                query = '''
+                    SELECT device_id, video_id, sync_date, status, file_path
+                    FROM sync_status
+                    WHERE 1=1
+                '''
+                params = []
+                
+                if device_id:
+                    query += ' AND device_id = ?'
+                    params.append(device_id)
+                
+                if video_id:
+                    query += ' AND video_id = ?'
+                    params.append(video_id)
+                
+                query += ' ORDER BY sync_date DESC'
+                
+                cursor.execute(query, params)
+                rows = cursor.fetchall()
             
             return [{
                 'device_id': row[0],
@@ -305,17 +435,12 @@ class Project5001Database:
     def add_device(self, device_id: str, device_name: str, device_type: str) -> bool:
         """Add a device to the rotation pool."""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT OR REPLACE INTO device_rotation 
-                (device_id, device_name, device_type, is_active)
-                VALUES (?, ?, ?, 1)
-            ''', (device_id, device_name, device_type))
-            
-            conn.commit()
-            conn.close()
+            with self._cursor() as cursor:
+                cursor.execute('''
+                    INSERT OR REPLACE INTO device_rotation 
+                    (device_id, device_name, device_type, is_active)
+                    VALUES (?, ?, ?, 1)
+                ''', (device_id, device_name, device_type))
             
             logging.info(f"Added device to rotation: {device_name}")
             return True
@@ -327,20 +452,17 @@ class Project5001Database:
     def get_available_devices(self) -> List[Dict]:
         """Get all available devices for rotation."""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT device_id, device_name, device_type, is_active, 
-                       last_used, rate_limit_count, last_rate_limit, 
-                       cooldown_until, success_count, failure_count
-                FROM device_rotation 
-                WHERE is_active = 1
-                ORDER BY last_used ASC NULLS FIRST
-            ''')
-            
-            rows = cursor.fetchall()
-            conn.close()
+            with self._cursor() as cursor:
+                cursor.execute('''
+                    SELECT device_id, device_name, device_type, is_active, 
+                           last_used, rate_limit_count, last_rate_limit, 
+                           cooldown_until, success_count, failure_count
+                    FROM device_rotation 
+                    WHERE is_active = 1
+                    ORDER BY last_used ASC NULLS FIRST
+                ''')
+                
+                rows = cursor.fetchall()
             
             return [{
                 'device_id': row[0],
@@ -359,99 +481,147 @@ class Project5001Database:
             logging.error(f"Failed to get available devices: {e}")
             return []
     
+    def set_devices_active(self, device_ids: List[str], active: bool) -> bool:
+        """Activate or deactivate several devices in one transaction.
+        
+        Reactivating a device also clears its cooldown.
+        """
+        try:
+            with self._cursor() as cursor:
+                if active:
+                    sql = 'UPDATE device_rotation SET is_active = 1, cooldown_until = NULL WHERE device_id = ?'
+                else:
+                    sql = 'UPDATE device_rotation SET is_active = 0 WHERE device_id = ?'
+                cursor.executemany(sql, [(device_id,) for device_id in device_ids])
+            return True
+            
+        except Exception as e:
+            logging.error(f"Failed to update devices {device_ids}: {e}")
+            return False
+    
     def update_device_usage(self, device_id: str, success: bool = True) -> bool:
         """Update device usage statistics."""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            with self._cursor() as cursor:
+                now = int(time.time())
+                
+                if success:
+                    cursor.execute('''
+                        UPDATE device_rotation 
+                        SET last_used = ?, success_count = success_count + 1
+                        WHERE device_id = ?
+                    ''', (now, device_id))
+                else:
+                    cursor.execute('''
+                        UPDATE device_rotation 
+                        SET last_used = ?, failure_count = failure_count + 1
+                        WHERE device_id = ?
+                    ''', (now, device_id))
             
-            now = datetime.now().isoformat()
+            return True
             
-            if success:
-                cursor.execute('''
-                    UPDATE device_rotation 
-                    SET last_used = ?, success_count = success_count + 1
-                    WHERE device_id = ?
-                ''', (now, device_id))
-            else:
+        except Exception as e:
+            logging.error(f"Failed to update device usage: {e}")
+            return False
+    
+    def record_rate_limit(self, device_id: str, event_type: str, details: str = None,
+                          log_event: bool = True, cooldown_until: Optional[int] = None) -> bool:
+        """Record a rate limiting event and put the device in cooldown.
+        
+        cooldown_until is the expiry as Unix epoch seconds (default: five
+        minutes from now). With log_event=False only the device's cooldown is
+        updated; the caller writes the event row itself (see add_rate_limit_events).
+        """
+        try:
+            with self._cursor() as cursor:
+                now = datetime.now().isoformat()
+                if cooldown_until is None:
+                    cooldown_until = int(time.time()) + 300
+                
+                # Update device rotation table
                 cursor.execute('''
                     UPDATE device_rotation 
-                    SET last_used = ?, failure_count = failure_count + 1
+                    SET rate_limit_count = rate_limit_count + 1,
+                        last_rate_limit = ?,
+                        cooldown_until = ?
                     WHERE device_id = ?
-                ''', (now, device_id))
-            
-            conn.commit()
-            conn.close()
+                ''', (now, cooldown_until, device_id))
+                
+                # Add to rate limit events table
+                if log_event:
+                    cursor.execute('''
+                        INSERT INTO rate_limit_events 
+                        (device_id, event_type, details)
+                        VALUES (?, ?, ?)
+                    ''', (device_id, event_type, details))
             
+            logging.warning(f"Rate limit recorded for device {device_id}: {event_type}")
             return True
             
         except Exception as e:
-            logging.error(f"Failed to update device usage: {e}")
+            logging.error(f"Failed to record rate limit: {e}")
             return False
     
-    def record_rate_limit(self, device_id: str, event_type: str, details: str = None) -> bool:
-        """Record a rate limiting event."""
+    def add_rate_limit_events(self, events: List[Tuple]) -> bool:
+        """Insert several rate limit events in one transaction.
+        
+        Each event is (device_id, event_date, event_type, details).
+        """
+        if not events:
+            return True
+        
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            now = datetime.now().isoformat()
-            cooldown_until = (datetime.now() + timedelta(minutes=5)).isoformat()
-            
-            # Update device rotation table
-            cursor.execute('''
-                UPDATE device_rotation 
-                SET rate_limit_count = rate_limit_count + 1,
-                    last_rate_limit = ?,
-                    cooldown_until = ?
-                WHERE device_id = ?
-            ''', (now, cooldown_until, device_id))
-            
-            # Add to rate limit events table
-            cursor.execute('''
-                INSERT INTO rate_limit_events 
-                (device_id, event_type, details)
-                VALUES (?, ?, ?)
-            ''', (device_id, event_type, details))
-            
-            conn.commit()
-            conn.close()
-            
-            logging.warning(f"Rate limit recorded for device {device_id}: {event_type}")
+            with self._cursor() as cursor:
+                cursor.executemany('''
+                    INSERT INTO rate_limit_events 
+                    (device_id, event_date, event_type, details)
+                    VALUES (?, ?, ?, ?)
+                ''', events)
             return True
             
         except Exception as e:
-            logging.error(f"Failed to record rate limit: {e}")
+            logging.error(f"Failed to record {len(events)} rate limit events: {e}")
             return False
     
+    def next_counter(self, key: str, seed: Callable[[], int]) -> int:
+        """Atomically take the next value of a persistent counter.
+        
+        seed() supplies the first value the first time the counter is used.
+        """
+        with self._cursor() as cursor:
+            # Take the write lock up front so other processes can't interleave
+            cursor.execute('BEGIN IMMEDIATE')
+            cursor.execute('SELECT value FROM meta WHERE key = ?', (key,))
+            row = cursor.fetchone()
+            value = row[0] if row else seed()
+            cursor.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, value + 1))
+        
+        return value
+    
     def get_database_stats(self) -> Dict:
         """Get database statistics."""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Total videos
-            cursor.execute('SELECT COUNT(*) FROM videos')
-            total_videos = cursor.fetchone()[0]
-            
-            # Recent videos (last 7 days)
-            cutoff_date = (datetime.now() - timedelta(days=7)).isoformat()
-            cursor.execute('SELECT COUNT(*) FROM videos WHERE download_date >= ?', (cutoff_date,))
-            recent_videos = cursor.fetchone()[0]
-            
-            # Total file size
-            cursor.execute('SELECT SUM(file_size) FROM videos WHERE file_size IS NOT NULL')
-            total_size = cursor.fetchone()[0] or 0
-            
-            # Device count
-            cursor.execute('SELECT COUNT(*) FROM device_rotation WHERE is_active = 1')
-            active_devices = cursor.fetchone()[0]
-            
-            # Sync status summary
-            cursor.execute('SELECT status, COUNT(*) FROM sync_status GROUP BY status')
-            sync_summary = dict(cursor.fetchall())
-            
-            conn.close()
+            with self._cursor() as cursor:
+                # Total videos
+                cursor.execute('SELECT COUNT(*) FROM videos')
+                total_videos = cursor.fetchone()[0]
+                
+                # Recent videos (last 7 days)
+                cutoff_date = (datetime.now() - timedelta(days=7)).isoformat()
+                cursor.execute('SELECT COUNT(*) FROM videos WHERE download_date >= ?', (cutoff_date,))
+                recent_videos = cursor.fetchone()[0]
+                
+                # Total file size
+                cursor.execute('SELECT SUM(file_size) FROM videos WHERE file_size IS NOT NULL')
+                total_size = cursor.fetchone()[0] or 0
+                
+                # Device count
+                cursor.execute('SELECT COUNT(*) FROM device_rotation WHERE is_active = 1')
+                active_devices = cursor.fetchone()[0]
+                
+                # Sync status summary
+                cursor.execute('SELECT status, COUNT(*) FROM sync_status GROUP BY status')
+                sync_summary = dict(cursor.fetchall())
             
             return {
                 'total_videos': total_videos,
@@ -4,8 +4,10 @@ Project 5001 - FFmpeg Auto-Installer
 Automatically installs FFmpeg system-wide on first run.
 """
 
+import io
 import os
 import sys
+import asyncio
 import platform
 import subprocess
 import shutil
@@ -13,9 +15,82 @@ import tempfile
 import zipfile
 import tarfile
 from pathlib import Path
-from urllib.request import urlretrieve
+from http.client import HTTPConnection, HTTPException, HTTPSConnection
+from urllib.parse import urlsplit
+from urllib.request import Request, urlopen, urlretrieve
 import ssl
 
+# Executables shipped in the Windows FFmpeg builds
+_WINDOWS_EXES = ('ffmpeg.exe', 'ffprobe.exe', 'ffplay.exe')
+
+class _HTTPRangeFile(io.RawIOBase):
+    """Read-only, seekable view of a remote file, fetched with HTTP Range requests.
+    
+    Lets zipfile read just the central directory and the members it needs.
+    All range requests share one keep-alive connection, released by close().
+    """
+    
+    def __init__(self, url: str):
+        with urlopen(Request(url, method='HEAD'), timeout=30) as response:
+            if response.headers.get('Accept-Ranges') != 'bytes':
+                raise OSError("Server does not support range requests")
+            self.size = int(response.headers['Content-Length'])
+            # Range requests go straight to the final location, skipping redirects
+            self.url = response.geturl()
+        self.pos = 0
+        
+        parts = urlsplit(self.url)
+        connection_class = HTTPSConnection if parts.scheme == 'https' else HTTPConnection
+        self._conn = connection_class(parts.netloc, timeout=60)
+        self._path = parts.path + (f'?{parts.query}' if parts.query else '')
+    
+    def close(self):
+        if not self.closed:
+            self._conn.close()
+        super().close()
+    
+    def readable(self) -> bool:
+        return True
+    
+    def seekable(self) -> bool:
+        return True
+    
+    def tell(self) -> int:
+        return self.pos
+    
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self.pos
+        elif whence == io.SEEK_END:
+            offset += self.size
+        self.pos = max(0, offset)
+        return self.pos
+    
+    def readinto(self, buffer) -> int:
+        end = min(self.pos + len(buffer), self.size)
+        if end <= self.pos:
+            return 0
+        
+        headers = {'Range': f'bytes={self.pos}-{end - 1}'}
+        for attempt in range(2):
+            try:
+                self._conn.request('GET', self._path, headers=headers)
+                response = self._conn.getresponse()
+                data = response.read()
+                break
+            except (ConnectionError, HTTPException) as e:
+                # The server may drop an idle keep-alive connection; reconnect once
+                self._conn.close()
+                if attempt:
+                    raise OSError(f"Range request failed: {e}") from e
+        
+        if response.status != 206:
+            raise OSError(f"Unexpected HTTP status {response.status} for range request")
+        
+        buffer[:len(data)] = data
+        self.pos += len(data)
+        return len(data)
+
 class FFmpegInstaller:
     """Cross-platform FFmpeg installer."""
     
@@ -24,26 +99,77 @@ class FFmpegInstaller:
         self.machine = platform.machine().lower()
         self.is_64bits = sys.maxsize > 2**32
         
+        # shutil.which results for the duration of this installer run
+        self._which_cache = {}
+        
+    def _run(self, cmd: list, timeout: int = 300) -> subprocess.CompletedProcess:
+        """Run a command with captured output, killing its whole process tree on timeout."""
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        try:
+            stdout, stderr = proc.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            self._kill_process_tree(proc)
+            proc.communicate()
+            raise
+        return subprocess.CompletedProcess(cmd, proc.returncode, stdout, stderr)
+    
+    def _kill_process_tree(self, proc: subprocess.Popen):
+        """Kill a process and any children it spawned (e.g. apt's dpkg workers)."""
+        try:
+            import psutil
+            children = psutil.Process(proc.pid).children(recursive=True)
+        except Exception:
+            # psutil missing or the process already exited
+            children = []
+        
+        for child in children:
+            try:
+                child.kill()
+            except Exception:
+                pass
+        try:
+            proc.kill()
+        except ProcessLookupError:
+            pass
+    
+    def _which(self, name: str):
+        """Cached shutil.which lookup."""
+        if name not in self._which_cache:
+            self._which_cache[name] = shutil.which(name)
+        return self._which_cache[name]
+    
     def is_ffmpeg_installed(self) -> bool:
         """Check if ffmpeg is already installed and available in PATH."""
-        return shutil.which('ffmpeg') is not None
+        return self._which('ffmpeg') is not None
     
     def get_ffmpeg_path(self) -> str:
         """Get the path to ffmpeg if installed."""
-        return shutil.which('ffmpeg') or ''
+        return self._which('ffmpeg') or ''
     
     def install_ffmpeg_windows(self) -> bool:
         """Install FFmpeg on Windows."""
         print("🔄 Installing FFmpeg on Windows...")
         
         try:
-            # Try using winget first (Windows 10 1709+)
-            if self._try_winget_install():
-                return True
+            package_managers = [
+                ('winget', ['winget', 'install', 'FFmpeg']),
+                ('chocolatey', ['choco', 'install', 'ffmpeg', '-y']),
+                ('scoop', ['scoop', 'install', 'ffmpeg'])
+            ]
             
-            # Try using chocolatey if available
-            if self._try_chocolatey_install():
-                return True
+            # Use the resolved path so .cmd shims (scoop) can be launched directly
+            available = []
+            for name, cmd in package_managers:
+                executable = self._which(cmd[0])
+                if executable:
+                    available.append((name, [executable] + cmd[1:]))
+            
+            if available:
+                print(f"   Trying {', '.join(name for name, _ in available)}...")
+                winner = self._race_package_managers(available)
+                if winner:
+                    print(f"✅ FFmpeg installed via {winner}")
+                    return True
             
             # Manual download and install
             return self._manual_windows_install()
@@ -52,31 +178,68 @@ class FFmpegInstaller:
             print(f"❌ Windows installation failed: {e}")
             return False
     
-    def _try_winget_install(self) -> bool:
-        """Try installing via winget."""
-        try:
-            print("   Trying winget...")
-            result = subprocess.run(['winget', 'install', 'FFmpeg'], 
-                                  capture_output=True, text=True, timeout=300)
-            if result.returncode == 0:
-                print("✅ FFmpeg installed via winget")
-                return True
-        except (subprocess.TimeoutExpired, FileNotFoundError):
-            pass
-        return False
+    def _race_package_managers(self, package_managers: list, timeout: int = 600) -> str:
+        """Run several installers at once; return the name of the first to succeed.
+        
+        An installer succeeds when it exits cleanly and its ffmpeg.exe can be
+        found. The remaining installers are killed as soon as one succeeds, so
+        the total time is that of the fastest manager rather than the sum.
+        """
+        async def attempt(name, cmd):
+            proc = await asyncio.create_subprocess_exec(
+                *cmd, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL)
+            try:
+                await asyncio.wait_for(proc.wait(), timeout)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                self._kill_process_tree(proc)
+                await proc.wait()
+                raise
+            # A zero exit alone isn't enough: only a manager whose ffmpeg is
+            # actually on disk may win and have the others killed
+            if proc.returncode == 0 and self._installed_ffmpeg(name):
+                return name
+            return None
+        
+        async def race():
+            tasks = [asyncio.create_task(attempt(name, cmd)) for name, cmd in package_managers]
+            try:
+                for next_done in asyncio.as_completed(tasks):
+                    try:
+                        winner = await next_done
+                    except (asyncio.TimeoutError, OSError):
+                        continue
+                    if winner:
+                        return winner
+                return ''
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+        
+        return asyncio.run(race())
     
-    def _try_chocolatey_install(self) -> bool:
-        """Try installing via chocolatey."""
-        try:
-            print("   Trying chocolatey...")
-            result = subprocess.run(['choco', 'install', 'ffmpeg', '-y'], 
-                                  capture_output=True, text=True, timeout=300)
-            if result.returncode == 0:
-                print("✅ FFmpeg installed via chocolatey")
-                return True
-        except (subprocess.TimeoutExpired, FileNotFoundError):
-            pass
-        return False
+    def _installed_ffmpeg(self, manager: str) -> str:
+        """Locate the ffmpeg.exe a Windows package manager just installed, or ''.
+        
+        This process's PATH predates the install, so the manager's own shim or
+        link directory is checked before falling back to a fresh PATH lookup.
+        """
+        home = Path.home()
+        local_appdata = Path(os.environ.get('LOCALAPPDATA', home / 'AppData' / 'Local'))
+        candidates = {
+            'winget': [local_appdata / 'Microsoft' / 'WinGet' / 'Links' / 'ffmpeg.exe'],
+            'chocolatey': [Path(os.environ.get('ChocolateyInstall', 'C:/ProgramData/chocolatey')) / 'bin' / 'ffmpeg.exe'],
+            'scoop': [Path(os.environ.get('SCOOP', home / 'scoop')) / 'shims' / 'ffmpeg.exe']
+        }.get(manager, [])
+        
+        if manager == 'winget':
+            # Without a Links entry the package lands in its own versioned folder
+            candidates += (local_appdata / 'Microsoft' / 'WinGet' / 'Packages').glob('*FFmpeg*/*/bin/ffmpeg.exe')
+        
+        for candidate in candidates:
+            if candidate.is_file():
+                return str(candidate)
+        return shutil.which('ffmpeg') or ''
     
     def _manual_windows_install(self) -> bool:
         """Manual download and install for Windows."""
@@ -90,16 +253,17 @@ class FFmpegInstaller:
         
         try:
             with tempfile.TemporaryDirectory() as temp_dir:
-                zip_path = Path(temp_dir) / filename
-                
-                # Download
+                # Pull only the executables out of the remote archive when the
+                # server allows ranged reads; otherwise download the whole zip
                 print(f"   Downloading from {url}...")
-                urlretrieve(url, zip_path)
-                
-                # Extract
-                print("   Extracting...")
-                with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                    zip_ref.extractall(temp_dir)
+                if not self._extract_remote_members(url, temp_dir, _WINDOWS_EXES):
+                    zip_path = Path(temp_dir) / filename
+                    urlretrieve(url, zip_path)
+                    
+                    # Extract
+                    print("   Extracting...")
+                    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+                        self._extract_members(zip_ref, temp_dir, _WINDOWS_EXES)
                 
                 # Find ffmpeg.exe
                 ffmpeg_exe = None
@@ -120,7 +284,7 @@ class FFmpegInstaller:
                 bin_dir = install_dir / "bin"
                 bin_dir.mkdir(exist_ok=True)
                 
-                for exe in ['ffmpeg.exe', 'ffprobe.exe', 'ffplay.exe']:
+                for exe in _WINDOWS_EXES:
                     src = ffmpeg_exe.parent / exe
                     if src.exists():
                         shutil.copy2(src, bin_dir / exe)
@@ -135,6 +299,31 @@ class FFmpegInstaller:
             print(f"❌ Manual installation failed: {e}")
             return False
     
+    @staticmethod
+    def _extract_members(zip_ref: zipfile.ZipFile, dest_dir: str, names: tuple) -> int:
+        """Extract only the members whose base name is in names; returns how many matched."""
+        members = [name for name in zip_ref.namelist()
+                   if name.rsplit('/', 1)[-1] in names]
+        for name in members:
+            zip_ref.extract(name, dest_dir)
+        return len(members)
+    
+    def _extract_remote_members(self, url: str, dest_dir: str, names: tuple) -> bool:
+        """Extract the archive members with the given base names straight from a remote zip.
+        
+        Returns False if the server cannot serve ranged reads or nothing matched.
+        """
+        try:
+            with _HTTPRangeFile(url) as raw, \
+                    io.BufferedReader(raw, buffer_size=1 << 20) as remote, \
+                    zipfile.ZipFile(remote, 'r') as zip_ref:
+                print("   Extracting from the remote archive...")
+                return self._extract_members(zip_ref, dest_dir, names) > 0
+            
+        except (OSError, zipfile.BadZipFile) as e:
+            print(f"   Ranged download unavailable ({e}), downloading the full archive")
+            return False
+    
     def _add_to_windows_path(self, path: str):
         """Add directory to Windows PATH."""
         try:
@@ -163,34 +352,42 @@ class FFmpegInstaller:
         print("🔄 Installing FFmpeg on Linux...")
         
         try:
-            # Try different package managers
+            # Try different package managers; each entry is a sequence of commands
             package_managers = [
-                ('apt', ['apt', 'update', '&&', 'apt', 'install', '-y', 'ffmpeg']),
-                ('yum', ['yum', 'install', '-y', 'ffmpeg']),
-                ('dnf', ['dnf', 'install', '-y', 'ffmpeg']),
-                ('pacman', ['pacman', '-S', '--noconfirm', 'ffmpeg']),
-                ('zypper', ['zypper', 'install', '-y', 'ffmpeg'])
+                ('apt', [['apt', 'update'], ['apt', 'install', '-y', 'ffmpeg']]),
+                ('yum', [['yum', 'install', '-y', 'ffmpeg']]),
+                ('dnf', [['dnf', 'install', '-y', 'ffmpeg']]),
+                ('pacman', [['pacman', '-S', '--noconfirm', 'ffmpeg']]),
+                ('zypper', [['zypper', 'install', '-y', 'ffmpeg']])
             ]
             
-            for name, cmd in package_managers:
-                if self._try_package_manager(name, cmd):
+            # Only spawn package managers that are actually present
+            available = [(name, cmds) for name, cmds in package_managers if self._which(cmds[0][0])]
+            if not available:
+                print("❌ No supported package manager found")
+                return False
+            
+            for name, cmds in available:
+                if self._try_package_manager(name, cmds):
                     return True
             
-            print("❌ No supported package manager found")
+            print("❌ FFmpeg could not be installed with the available package managers")
             return False
             
         except Exception as e:
             print(f"❌ Linux installation failed: {e}")
             return False
     
-    def _try_package_manager(self, name: str, cmd: list) -> bool:
-        """Try installing via a specific package manager."""
+    def _try_package_manager(self, name: str, cmds: list) -> bool:
+        """Try installing via a specific package manager, running each command in turn."""
         try:
             print(f"   Trying {name}...")
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
-            if result.returncode == 0:
-                print(f"✅ FFmpeg installed via {name}")
-                return True
+            for cmd in cmds:
+                result = self._run(cmd)
+                if result.returncode != 0:
+                    return False
+            print(f"✅ FFmpeg installed via {name}")
+            return True
         except (subprocess.TimeoutExpired, FileNotFoundError):
             pass
         return False
@@ -219,8 +416,7 @@ class FFmpegInstaller:
         """Try installing via Homebrew."""
         try:
             print("   Trying Homebrew...")
-            result = subprocess.run(['brew', 'install', 'ffmpeg'], 
-                                  capture_output=True, text=True, timeout=300)
+            result = self._run(['brew', 'install', 'ffmpeg'])
             if result.returncode == 0:
                 print("✅ FFmpeg installed via Homebrew")
                 return True
@@ -232,8 +428,7 @@ class FFmpegInstaller:
         """Try installing via MacPorts."""
         try:
             print("   Trying MacPorts...")
-            result = subprocess.run(['sudo', 'port', 'install', 'ffmpeg'], 
-                                  capture_output=True, text=True, timeout=300)
+            result = self._run(['sudo', 'port', 'install', 'ffmpeg'])
             if result.returncode == 0:
                 print("✅ FFmpeg installed via MacPorts")
                 return True
@@ -250,14 +445,19 @@ class FFmpegInstaller:
         print(f"🔍 Detected platform: {self.system} ({self.machine})")
         
         if self.system == 'windows':
-            return self.install_ffmpeg_windows()
+            success = self.install_ffmpeg_windows()
         elif self.system == 'linux':
-            return self.install_ffmpeg_linux()
+            success = self.install_ffmpeg_linux()
         elif self.system == 'darwin':
-            return self.install_ffmpeg_macos()
+            success = self.install_ffmpeg_macos()
         else:
             print(f"❌ Unsupported platform: {self.system}")
             return False
+        
+        if success:
+            # PATH contents changed; look ffmpeg up again next time
+            self._which_cache.pop('ffmpeg', None)
+        return success
     
     def cleanup_local_binaries(self):
         """Remove local ffmpeg binaries if they exist."""
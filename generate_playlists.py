@@ -8,9 +8,13 @@ import os
 import sqlite3
 import logging
 import re  # Added for filename sanitization
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain, count, groupby
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import List, Dict
+from typing import Iterable, List
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -20,6 +24,16 @@ load_dotenv()
 DEST_DIR = Path(os.getenv('DEST_DIR', './Project5001/Harvest'))
 PLAYLISTS_DIR = Path('./Project5001/Playlists')
 
+# Artist filename sanitization: keep letters, digits, spaces, '-' and '_'
+_UNSAFE_ARTIST_CHARS = re.compile(r'[^\w \-]')
+_WHITESPACE = re.compile(r'\s+')
+
+# Playlist entry from a (id, title, artist, filename, ...) row: artist, title, dir prefix, filename
+_EXTINF_ENTRY = "#EXTINF:-1,%s - %s\n%s%s\n"
+
+# Playlist output buffer (1 MiB) so large playlists flush in few syscalls
+_WRITE_BUFFER_SIZE = 1024 * 1024
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
@@ -42,17 +56,101 @@ class PlaylistGenerator:
         (self.playlists_dir / 'ByMonth').mkdir(exist_ok=True)
         (self.playlists_dir / 'ByArtist').mkdir(exist_ok=True)
         
+        # Playlists deferred for concurrent writing by generate_all_playlists
+        self._pending_writes = None
+        
+        # Single connection shared by all queries
+        self.conn = sqlite3.connect(self.db_path, cached_statements=256)
+        self.conn.row_factory = sqlite3.Row
+        
         # Check which date column exists in the database
         self._date_column = self._get_date_column()
+        self._configure_connection()
+        self._prepare_statements()
+    
+    def _prepare_statements(self):
+        """Build the SQL text once so SQLite's statement cache is hit on every call."""
+        date = self._date_column
+        
+        # All tracks, oldest first
+        self._sql_all = f'''
+        SELECT id, title, artist, filename, {date} AS date
+        FROM videos 
+        ORDER BY {date} ASC
+        '''
+        
+        # Tracks added since a cutoff, newest first
+        self._sql_recent = f'''
+        SELECT id, title, artist, filename, {date} AS date
+        FROM videos 
+        WHERE {date} >= ?
+        ORDER BY {date} DESC
+        '''
+        
+        # Tracks by one artist
+        self._sql_by_artist = f'''
+        SELECT id, title, artist, filename, {date} AS date
+        FROM videos 
+        WHERE artist = ?
+        ORDER BY {date} ASC
+        '''
+        
+        # Tracks in a date range
+        self._sql_by_month = f'''
+        SELECT id, title, artist, filename, {date} AS date
+        FROM videos 
+        WHERE {date} >= ? AND {date} < ?
+        ORDER BY {date} ASC
+        '''
+        
+        # Tracks in a date range, tagged with their month
+        self._sql_monthly = f'''
+        SELECT id, title, artist, filename, {date} AS date,
+               strftime('%Y-%m', {date}) AS month
+        FROM videos 
+        WHERE {date} >= ? AND {date} < ?
+        ORDER BY {date} ASC
+        '''
+        
+        # Every track ordered by artist, for grouping
+        self._sql_artist_scan = f'''
+        SELECT id, title, artist, filename, {date} AS date
+        FROM videos 
+        WHERE artist IS NOT NULL
+        ORDER BY artist, {date} ASC
+        '''
+    
+    def _configure_connection(self):
+        """Tune the connection for the read-heavy playlist workload."""
+        pragmas = [
+            'PRAGMA journal_mode=WAL',
+            'PRAGMA synchronous=NORMAL',
+            'PRAGMA temp_store=MEMORY',
+            'PRAGMA mmap_size=268435456',  # 256 MiB memory-mapped I/O
+            'PRAGMA cache_size=-65536'  # 64 MiB page cache
+        ]
+        for pragma in pragmas:
+            try:
+                self.conn.execute(pragma)
+            except sqlite3.OperationalError as e:
+                logger.warning(f"Could not apply {pragma}: {e}")
+    
+    def close(self):
+        """Close the database connection."""
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
     
     def _get_date_column(self) -> str:
         """Determine which date column exists in the database."""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute('PRAGMA table_info(videos)')
-            columns = [row[1] for row in cursor.fetchall()]
-            conn.close()
+            columns = {row[1] for row in self.conn.execute('PRAGMA table_info(videos)')}
             
             # Return appropriate column name based on what exists
             return 'ts' if 'ts' in columns else 'download_date'
@@ -60,86 +158,39 @@ class PlaylistGenerator:
             # Default to download_date for new databases
             return 'download_date'
     
-    def get_all_tracks(self) -> List[Dict]:
+    def iter_all_tracks(self) -> sqlite3.Cursor:
+        """Get a cursor over all tracks from database, for streaming."""
+        cursor = self.conn.cursor()
+        
+        cursor.execute(self._sql_all)
+        
+        return cursor
+    
+    def get_all_tracks(self) -> List[sqlite3.Row]:
         """Get all tracks from database."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute(f'''
-            SELECT id, title, artist, filename, {self._date_column} 
-            FROM videos 
-            ORDER BY {self._date_column} ASC
-        ''')
-        
-        tracks = []
-        for row in cursor.fetchall():
-            tracks.append({
-                'id': row[0],
-                'title': row[1],
-                'artist': row[2],
-                'filename': row[3],
-                'date': row[4]  # Fixed: unified date field name
-            })
-        
-        conn.close()
-        return tracks
+        return self.iter_all_tracks().fetchall()
     
-    def get_recent_tracks(self, days: int = 30) -> List[Dict]:
+    def get_recent_tracks(self, days: int = 30) -> List[sqlite3.Row]:
         """Get tracks added in the last N days."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self.conn.cursor()
         
         cutoff_date = datetime.now() - timedelta(days=days)
         
-        cursor.execute(f'''
-            SELECT id, title, artist, filename, {self._date_column} 
-            FROM videos 
-            WHERE {self._date_column} >= ?
-            ORDER BY {self._date_column} DESC
-        ''', (cutoff_date.isoformat(),))
-        
-        tracks = []
-        for row in cursor.fetchall():
-            tracks.append({
-                'id': row[0],
-                'title': row[1],
-                'artist': row[2],
-                'filename': row[3],
-                'date': row[4]  # Fixed: unified date field name
-            })
-        
-        conn.close()
-        return tracks
+        cursor.execute(self._sql_recent, (cutoff_date.isoformat(),))
+        
+        return cursor.fetchall()
     
-    def get_tracks_by_artist(self, artist: str) -> List[Dict]:
+    def get_tracks_by_artist(self, artist: str) -> List[sqlite3.Row]:
         """Get all tracks by a specific artist."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute(f'''
-            SELECT id, title, artist, filename, {self._date_column} 
-            FROM videos 
-            WHERE artist LIKE ?
-            ORDER BY {self._date_column} ASC
-        ''', (f'%{artist}%',))
-        
-        tracks = []
-        for row in cursor.fetchall():
-            tracks.append({
-                'id': row[0],
-                'title': row[1],
-                'artist': row[2],
-                'filename': row[3],
-                'date': row[4]  # Fixed: unified date field name
-            })
-        
-        conn.close()
-        return tracks
+        cursor = self.conn.cursor()
+        
+        cursor.execute(self._sql_by_artist, (artist,))
+        
+        return cursor.fetchall()
     
-    def get_tracks_by_month(self, year: int, month: int) -> List[Dict]:
+    def get_tracks_by_month(self, year: int, month: int) -> List[sqlite3.Row]:
         """Get tracks added in a specific month."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self.conn.cursor()
         
         start_date = datetime(year, month, 1)
         if month == 12:
@@ -147,106 +198,139 @@ class PlaylistGenerator:
         else:
             end_date = datetime(year, month + 1, 1)
         
-        cursor.execute(f'''
-            SELECT id, title, artist, filename, {self._date_column} 
-            FROM videos 
-            WHERE {self._date_column} >= ? AND {self._date_column} < ?
-            ORDER BY {self._date_column} ASC
-        ''', (start_date.isoformat(), end_date.isoformat()))
-        
-        tracks = []
-        for row in cursor.fetchall():
-            tracks.append({
-                'id': row[0],
-                'title': row[1],
-                'artist': row[2],
-                'filename': row[3],
-                'date': row[4]  # Fixed: unified date field name
-            })
-        
-        conn.close()
-        return tracks
+        cursor.execute(self._sql_by_month, (start_date.isoformat(), end_date.isoformat()))
+        
+        return cursor.fetchall()
     
-    def write_playlist(self, tracks: List[Dict], playlist_path: Path, title: str = ""):
-        """Write tracks to M3U playlist file."""
-        if not tracks:
+    def write_playlist(self, tracks: Iterable[sqlite3.Row], playlist_path: Path, title: str = ""):
+        """Write tracks to M3U playlist file.
+        
+        Lists are written in one go; any other iterable (e.g. a cursor) is
+        streamed to a temporary file, then copied in behind the header once
+        the track total is known.
+        """
+        if isinstance(tracks, list):
+            total = len(tracks)
+        else:
+            tracks = iter(tracks)
+            first = next(tracks, None)
+            total = 0 if first is None else None
+            if first is not None:
+                tracks = chain([first], tracks)
+        
+        if total == 0:
             logger.warning(f"No tracks to write to {playlist_path}")
             return
         
-        with open(playlist_path, 'w', encoding='utf-8') as f:
-            f.write(f"#EXTM3U\n")
-            f.write(f"# {title}\n")
-            f.write(f"# Generated by Project 5001 on {datetime.now().isoformat()}\n")
-            f.write(f"# Total tracks: {len(tracks)}\n\n")
-            
-            for track in tracks:
-                # Write extended info
-                f.write(f"#EXTINF:-1,{track['artist']} - {track['title']}\n")
-                # Write file path relative to playlist location
-                relative_path = self.dest_dir / track['filename']
-                f.write(f"{relative_path}\n")
-        
-        logger.info(f"Generated playlist: {playlist_path} ({len(tracks)} tracks)")
+        header = (
+            f"#EXTM3U\n"
+            f"# {title}\n"
+            f"# Generated by Project 5001 on {datetime.now().isoformat()}\n"
+        )
+        # Extended info line followed by the file path relative to playlist location
+        dest_prefix = os.fspath(self.dest_dir) + os.sep
+        lines = (
+            _EXTINF_ENTRY % (track[2], track[1], dest_prefix, track[3])
+            for track in tracks
+        )
+        
+        if total is not None:
+            with open(playlist_path, 'w', encoding='utf-8', buffering=_WRITE_BUFFER_SIZE) as f:
+                f.write(header)
+                f.write(f"# Total tracks: {total}\n\n")
+                f.writelines(lines)
+        else:
+            tmp_path = playlist_path.with_name(playlist_path.name + '.tmp')
+            try:
+                with tempfile.TemporaryFile('w+', encoding='utf-8', dir=playlist_path.parent) as body:
+                    counter = count()
+                    body.writelines(line for line, _ in zip(lines, counter))
+                    total = next(counter)
+                    body.seek(0)
+                    
+                    with open(tmp_path, 'w', encoding='utf-8', buffering=_WRITE_BUFFER_SIZE) as f:
+                        f.write(header)
+                        f.write(f"# Total tracks: {total}\n\n")
+                        shutil.copyfileobj(body, f, _WRITE_BUFFER_SIZE)
+                os.replace(tmp_path, playlist_path)
+            except BaseException:
+                tmp_path.unlink(missing_ok=True)
+                raise
+        
+        logger.info(f"Generated playlist: {playlist_path} ({total} tracks)")
+    
+    def _queue_playlist(self, tracks: Iterable[sqlite3.Row], playlist_path: Path, title: str = ""):
+        """Write a playlist now, or defer it while generate_all_playlists is batching."""
+        # Cursors must be consumed on the connection's thread, so stream them now
+        if self._pending_writes is None or not isinstance(tracks, list):
+            self.write_playlist(tracks, playlist_path, title)
+        else:
+            self._pending_writes.append((tracks, playlist_path, title))
+    
+    def _flush_pending_writes(self):
+        """Write all deferred playlists concurrently."""
+        # Later jobs for the same file win, as they would when written in order
+        jobs = list({job[1]: job for job in self._pending_writes}.values())
+        self._pending_writes = None
+        
+        max_workers = min(32, (os.cpu_count() or 1) * 4)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(lambda job: self.write_playlist(*job), jobs))
     
     def generate_main_archive(self):
         """Generate main archive playlist with all tracks."""
-        tracks = self.get_all_tracks()
+        tracks = self.iter_all_tracks()
         playlist_path = self.playlists_dir / 'MainArchive.m3u'
-        self.write_playlist(tracks, playlist_path, "Project 5001 - Complete Archive")
+        self._queue_playlist(tracks, playlist_path, "Project 5001 - Complete Archive")
     
     def generate_new_additions(self, days: int = 30):
         """Generate playlist of recent additions."""
         tracks = self.get_recent_tracks(days)
         playlist_path = self.playlists_dir / 'NewAdditions.m3u'
-        self.write_playlist(tracks, playlist_path, f"Project 5001 - New Additions (Last {days} days)")
+        self._queue_playlist(tracks, playlist_path, f"Project 5001 - New Additions (Last {days} days)")
+    
+    def _month_window(self, months_back: int):
+        """First day of the oldest month to include and of the month after the current one."""
+        now = datetime.now()
+        first_index = now.year * 12 + now.month - 1 - (months_back - 1)
+        start_date = datetime(first_index // 12, first_index % 12 + 1, 1)
+        end_date = datetime(now.year + now.month // 12, now.month % 12 + 1, 1)
+        return start_date, end_date
     
     def generate_monthly_playlists(self, months_back: int = 6):
         """Generate monthly playlists for the last N months."""
-        now = datetime.now()
+        start_date, end_date = self._month_window(months_back)
         
-        for i in range(months_back):
-            # Calculate month
-            if now.month - i <= 0:
-                year = now.year - 1
-                month = 12 + (now.month - i)
-            else:
-                year = now.year
-                month = now.month - i
-            
-            tracks = self.get_tracks_by_month(year, month)
-            if tracks:
-                month_name = datetime(year, month, 1).strftime('%Y-%m')
-                playlist_path = self.playlists_dir / 'ByMonth' / f'{month_name}.m3u'
-                self.write_playlist(tracks, playlist_path, f"Project 5001 - {month_name}")
+        cursor = self.conn.cursor()
+        cursor.execute(self._sql_monthly, (start_date.isoformat(), end_date.isoformat()))
+        
+        for month_name, rows in groupby(cursor, key=lambda row: row['month']):
+            if month_name is None:
+                continue
+            playlist_path = self.playlists_dir / 'ByMonth' / f'{month_name}.m3u'
+            self._queue_playlist(list(rows), playlist_path, f"Project 5001 - {month_name}")
     
     def generate_artist_playlists(self, min_tracks: int = 3):
         """Generate playlists for artists with multiple tracks."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Get artists with multiple tracks
-        cursor.execute('''
-            SELECT artist, COUNT(*) as track_count
-            FROM videos 
-            GROUP BY artist 
-            HAVING COUNT(*) >= ?
-            ORDER BY track_count DESC
-        ''', (min_tracks,))
-        
-        artists = cursor.fetchall()
-        conn.close()
-        
-        for artist, track_count in artists:
-            tracks = self.get_tracks_by_artist(artist)
-            if tracks:
-                # Enhanced artist name sanitization for cross-platform filenames
-                safe_artist = "".join(c for c in artist if c.isalnum() or c in (' ', '-', '_')).strip()
-                safe_artist = re.sub(r'\s+', ' ', safe_artist)  # Normalize whitespace
-                safe_artist = safe_artist[:50] if len(safe_artist) > 50 else safe_artist  # Limit length
-                safe_artist = safe_artist or "Unknown_Artist"  # Fallback for empty names
-                
-                playlist_path = self.playlists_dir / 'ByArtist' / f'{safe_artist}.m3u'
-                self.write_playlist(tracks, playlist_path, f"Project 5001 - {artist} ({track_count} tracks)")
+        cursor = self.conn.cursor()
+        
+        # Single pass over all tracks, grouped by exact artist name
+        cursor.execute(self._sql_artist_scan)
+        
+        for artist, rows in groupby(cursor, key=lambda row: row['artist']):
+            tracks = list(rows)
+            track_count = len(tracks)
+            if track_count < min_tracks:
+                continue
+            
+            # Enhanced artist name sanitization for cross-platform filenames
+            safe_artist = _UNSAFE_ARTIST_CHARS.sub('', artist).strip()
+            safe_artist = _WHITESPACE.sub(' ', safe_artist)  # Normalize whitespace
+            safe_artist = safe_artist[:50] if len(safe_artist) > 50 else safe_artist  # Limit length
+            safe_artist = safe_artist or "Unknown_Artist"  # Fallback for empty names
+            
+            playlist_path = self.playlists_dir / 'ByArtist' / f'{safe_artist}.m3u'
+            self._queue_playlist(tracks, playlist_path, f"Project 5001 - {artist} ({track_count} tracks)")
     
     def generate_favorites_playlist(self, top_n: int = 100):
         """Generate a 'favorites' playlist based on most recent additions."""
@@ -255,57 +339,101 @@ class PlaylistGenerator:
             tracks = tracks[:top_n]
         
         playlist_path = self.playlists_dir / 'Favorites.m3u'
-        self.write_playlist(tracks, playlist_path, f"Project 5001 - Recent Favorites (Top {len(tracks)})")
+        self._queue_playlist(tracks, playlist_path, f"Project 5001 - Recent Favorites (Top {len(tracks)})")
+    
+    def _generate_date_playlists(self, new_days: int = 30, favorites_days: int = 7,
+                                 favorites_top_n: int = 100, months_back: int = 6):
+        """Generate the main, new additions, favorites and monthly playlists from one scan.
+        
+        The date-ordered cursor is streamed into MainArchive.m3u while the
+        rows belonging to the smaller playlists are collected on the way.
+        """
+        now = datetime.now()
+        new_cutoff = (now - timedelta(days=new_days)).isoformat()
+        favorites_cutoff = (now - timedelta(days=favorites_days)).isoformat()
+        month_start, month_end = (d.isoformat() for d in self._month_window(months_back))
+        
+        new_tracks = []
+        favorites = []
+        monthly = {}
+        
+        def collect(rows):
+            for row in rows:
+                date = row['date']
+                if isinstance(date, str):
+                    if date >= new_cutoff:
+                        new_tracks.append(row)
+                    if date >= favorites_cutoff:
+                        favorites.append(row)
+                    if month_start <= date < month_end:
+                        monthly.setdefault(date[:7], []).append(row)
+                yield row
+        
+        self._queue_playlist(collect(self.iter_all_tracks()), self.playlists_dir / 'MainArchive.m3u',
+                             "Project 5001 - Complete Archive")
+        
+        # Recent playlists list the newest tracks first
+        new_tracks.reverse()
+        self._queue_playlist(new_tracks, self.playlists_dir / 'NewAdditions.m3u',
+                             f"Project 5001 - New Additions (Last {new_days} days)")
+        
+        favorites = favorites[::-1][:favorites_top_n]
+        self._queue_playlist(favorites, self.playlists_dir / 'Favorites.m3u',
+                             f"Project 5001 - Recent Favorites (Top {len(favorites)})")
+        
+        for month_name, tracks in monthly.items():
+            playlist_path = self.playlists_dir / 'ByMonth' / f'{month_name}.m3u'
+            self._queue_playlist(tracks, playlist_path, f"Project 5001 - {month_name}")
     
     def generate_all_playlists(self):
         """Generate all playlists."""
         logger.info("Starting playlist generation")
         
+        self._pending_writes = []
         try:
-            # Main playlists
-            self.generate_main_archive()
-            self.generate_new_additions()
-            self.generate_favorites_playlist()
-            
-            # Monthly playlists
-            self.generate_monthly_playlists()
+            # Main, recent and monthly playlists share one date-ordered scan
+            self._generate_date_playlists()
             
             # Artist playlists
             self.generate_artist_playlists()
             
+            self._flush_pending_writes()
+            
             logger.info("Playlist generation completed successfully")
             
         except Exception as e:
             logger.error(f"Error generating playlists: {e}")
             raise
+        finally:
+            self._pending_writes = None
 
 def main():
     """Main entry point."""
-    generator = PlaylistGenerator()
-    
     import sys
-    if len(sys.argv) > 1:
-        command = sys.argv[1]
-        
-        if command == 'main':
-            generator.generate_main_archive()
-        elif command == 'new':
-            days = int(sys.argv[2]) if len(sys.argv) > 2 else 30
-            generator.generate_new_additions(days)
-        elif command == 'monthly':
-            months = int(sys.argv[2]) if len(sys.argv) > 2 else 6
-            generator.generate_monthly_playlists(months)
-        elif command == 'artists':
-            min_tracks = int(sys.argv[2]) if len(sys.argv) > 2 else 3
-            generator.generate_artist_playlists(min_tracks)
-        elif command == 'favorites':
-            top_n = int(sys.argv[2]) if len(sys.argv) > 2 else 100
-            generator.generate_favorites_playlist(top_n)
+    
+    with PlaylistGenerator() as generator:
+        if len(sys.argv) > 1:
+            command = sys.argv[1]
+        
+            if command == 'main':
+                generator.generate_main_archive()
+            elif command == 'new':
+                days = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+                generator.generate_new_additions(days)
+            elif command == 'monthly':
+                months = int(sys.argv[2]) if len(sys.argv) > 2 else 6
+                generator.generate_monthly_playlists(months)
+            elif command == 'artists':
+                min_tracks = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+                generator.generate_artist_playlists(min_tracks)
+            elif command == 'favorites':
+                top_n = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+                generator.generate_favorites_playlist(top_n)
+            else:
+                print("Unknown command. Use: main, new, monthly, artists, favorites, or all")
         else:
-            print("Unknown command. Use: main, new, monthly, artists, favorites, or all")
-    else:
-        # Generate all playlists
-        generator.generate_all_playlists()
+            # Generate all playlists
+            generator.generate_all_playlists()
 
 if __name__ == '__main__':
     main() 
\ No newline at end of file
@@ -7,14 +7,54 @@ Manages single instance control, PID files, and real-time status monitoring.
 import os
 import sys
 import time
-import signal
 import subprocess
 import threading
 import json
+import functools
 from pathlib import Path
-from typing import Dict, Optional, List
+from typing import BinaryIO, Dict, Optional, List
 from datetime import datetime
 import platform
+import psutil  # Cross-platform process utilities
+
+@functools.lru_cache(maxsize=None)
+def _ensure_dir(path: str):
+    """Create a directory tree, at most once per path per process."""
+    Path(path).mkdir(parents=True, exist_ok=True)
+
+def tail_lines(f: BinaryIO, lines: int) -> List[str]:
+    """Return the last lines of an open binary file, reading backwards from the end in blocks."""
+    if lines <= 0:
+        return []
+    
+    pos = f.seek(0, os.SEEK_END)
+    buf = b''
+    while pos > 0 and buf.count(b'\n') <= lines:
+        step = min(8192, pos)
+        pos -= step
+        f.seek(pos)
+        buf = f.read(step) + buf
+    
+    text = buf.decode('utf-8', errors='replace').replace('\r\n', '\n')
+    return text.splitlines(keepends=True)[-lines:]
+
+def watch_directory(directory: Path, changed: threading.Event):
+    """Set changed on any change in directory; returns the watchdog observer, or None if watchdog is missing."""
+    try:
+        from watchdog.observers import Observer
+        from watchdog.events import FileSystemEventHandler
+    except ImportError:
+        return None
+    
+    class ChangeHandler(FileSystemEventHandler):
+        def on_any_event(self, event):
+            changed.set()
+    
+    observer = Observer()
+    observer.daemon = True
+    observer.schedule(ChangeHandler(), str(directory), recursive=False)
+    observer.start()
+    return observer
 
 class HarvesterManager:
     """Manages harvester instance control and monitoring."""
@@ -24,10 +64,9 @@ class HarvesterManager:
         self.status_file = Path("Project5001/harvester_status.json")
         self.log_file = Path("Project5001/Logs/harvester.log")
         
-        # Ensure directories exist
-        self.pid_file.parent.mkdir(parents=True, exist_ok=True)
-        self.status_file.parent.mkdir(parents=True, exist_ok=True)
-        self.log_file.parent.mkdir(parents=True, exist_ok=True)
+        # Ensure directories exist (once per process, however many managers are created)
+        for directory in {self.pid_file.parent, self.status_file.parent, self.log_file.parent}:
+            _ensure_dir(str(directory))
     
     def is_running(self) -> bool:
         """Check if harvester is currently running."""
@@ -127,22 +166,17 @@ class HarvesterManager:
                     "message": "Could not determine harvester PID"
                 }
             
-            # Try graceful shutdown first
-            if platform.system() == "Windows":
-                subprocess.run(['taskkill', '/PID', str(pid), '/F'], 
-                             capture_output=True, text=True)
-            else:
-                os.kill(pid, signal.SIGTERM)
-                
-                # Wait for graceful shutdown
-                for _ in range(10):
-                    if not self._is_process_running(pid):
-                        break
-                    time.sleep(1)
-                
+            # Try graceful shutdown first (SIGTERM, or TerminateProcess on Windows),
+            # returning as soon as the process exits
+            try:
+                process = psutil.Process(pid)
+                process.terminate()
+                process.wait(timeout=10)
+            except psutil.NoSuchProcess:
+                pass
+            except psutil.TimeoutExpired:
                 # Force kill if still running
-                if self._is_process_running(pid):
-                    os.kill(pid, signal.SIGKILL)
+                process.kill()
             
             # Clean up
             self._cleanup_pid_file()
@@ -188,9 +222,8 @@ class HarvesterManager:
             return []
         
         try:
-            with open(self.log_file, 'r', encoding='utf-8') as f:
-                all_lines = f.readlines()
-                return all_lines[-lines:] if len(all_lines) > lines else all_lines
+            with open(self.log_file, 'rb') as f:
+                return tail_lines(f, lines)
         except Exception:
             return []
     
@@ -199,50 +232,83 @@ class HarvesterManager:
         if not self.log_file.exists():
             return
         
+        changed = threading.Event()
+        self._stop_following = stop = threading.Event()
+        self._log_changed = changed
+        
+        # Block on file notifications when watchdog is available, otherwise poll
+        observer = watch_directory(self.log_file.parent, changed)
+        poll_interval = 5 if observer else 0.1
+        
         def follow():
-            with open(self.log_file, 'r', encoding='utf-8') as f:
-                # Go to end of file
-                f.seek(0, 2)
-                
-                while True:
-                    line = f.readline()
-                    if line:
-                        if callback:
-                            callback(line.strip())
+            try:
+                with open(self.log_file, 'r', encoding='utf-8') as f:
+                    # Go to end of file
+                    f.seek(0, 2)
+                    
+                    while not stop.is_set():
+                        line = f.readline()
+                        if line:
+                            if callback:
+                                callback(line.strip())
+                            else:
+                                print(line.strip())
                         else:
-                            print(line.strip())
-                    else:
-                        time.sleep(0.1)
+                            changed.wait(poll_interval)
+                            changed.clear()
+            finally:
+                if observer:
+                    observer.stop()
         
         # Start following in a separate thread
         thread = threading.Thread(target=follow, daemon=True)
         thread.start()
         return thread
     
+    def stop_following(self):
+        """Stop the thread started by follow_logs."""
+        stop = getattr(self, '_stop_following', None)
+        if stop:
+            stop.set()
+            self._log_changed.set()
+    
     def _is_process_running(self, pid: int) -> bool:
         """Check if a process with given PID is running."""
         try:
             if platform.system() == "Windows":
-                result = subprocess.run(['tasklist', '/FI', f'PID eq {pid}'], 
-                                      capture_output=True, text=True)
-                return str(pid) in result.stdout
+                return psutil.pid_exists(pid)
             else:
                 os.kill(pid, 0)  # Signal 0 doesn't kill, just checks if process exists
                 return True
-        except (OSError, subprocess.SubprocessError):
+        except OSError:
             return False
     
     def _detect_harvester_process(self) -> bool:
-        """Detect harvester process using system commands."""
+        """Detect a harvester started outside the manager and record its PID."""
+        windows = platform.system() == "Windows"
+        # Reading every command line is the expensive part; on Windows the
+        # cheap image name narrows the scan to python processes first
+        attrs = ['pid', 'name'] if windows else ['pid', 'cmdline']
         try:
-            if platform.system() == "Windows":
-                result = subprocess.run(['tasklist', '/FI', 'IMAGENAME eq python.exe', '/FO', 'CSV'], 
-                                      capture_output=True, text=True)
-                return result.returncode == 0 and 'harvester_v2.py' in result.stdout
-            else:
-                result = subprocess.run(['pgrep', '-f', 'harvester_v2.py'], 
-                                      capture_output=True, text=True)
-                return result.returncode == 0
+            for proc in psutil.process_iter(attrs):
+                try:
+                    if proc.info['pid'] == os.getpid():
+                        continue
+                    if windows:
+                        if not (proc.info['name'] or '').lower().startswith('python'):
+                            continue
+                        cmdline = proc.cmdline()
+                    else:
+                        cmdline = proc.info['cmdline']
+                    
+                    if 'harvester_v2.py' in ' '.join(cmdline or []):
+                        # Cache the PID so the next check takes the PID file fast path
+                        with open(self.pid_file, 'w') as f:
+                            f.write(str(proc.info['pid']))
+                        return True
+                except (psutil.NoSuchProcess, psutil.AccessDenied):
+                    continue
+            return False
         except Exception:
             return False
     
@@ -270,8 +336,11 @@ class HarvesterManager:
             current_status = self._load_status() or {}
             current_status.update(status_update)
             
-            with open(self.status_file, 'w') as f:
-                json.dump(current_status, f, indent=2)
+            # Write a sibling temp file and swap it in so readers never see partial JSON
+            tmp_file = self.status_file.with_suffix('.json.tmp')
+            with open(tmp_file, 'w') as f:
+                json.dump(current_status, f)
+            os.replace(tmp_file, self.status_file)
         except Exception:
             pass
     
@@ -6,21 +6,56 @@ Core harvesting system with rate limiting detection, device rotation, and smart
 
 import os
 import sys
-import json
+import asyncio
 import logging
 import time
-import subprocess
+import threading
 import requests
 import re
+import shutil
 import platform  # Added for cross-platform compatibility
+import xml.etree.ElementTree as ET
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple
+from urllib.parse import urlparse, parse_qs
+from typing import Iterator, List, Dict, Optional, Tuple
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
+import yt_dlp
+
 from config import NodeConfig
 from database import Project5001Database
-from rate_limiter import RateLimitDetector, DeviceManager
+from rate_limiter import AdaptiveConcurrency, TokenBucket, RateLimitDetector, DeviceManager
+
+# Common YouTube title suffixes, stripped in a single pass by clean_title
+_SUFFIX_WORDS = r'OFFICIAL (?:MUSIC )?VIDEO|MUSIC VIDEO|LYRICS|AUDIO|HQ|HD|4K|1080P|720P'
+_SUFFIX_RE = re.compile(rf'\s*(?:\[(?:{_SUFFIX_WORDS})\]|\((?:{_SUFFIX_WORDS})\))', re.IGNORECASE)
+# Invalid filename characters, control characters and anything outside the safe set
+_UNSAFE_CHAR_RE = re.compile(r'[<>:"/\\|?*\x00-\x1f\x7f-\x9f]|[^\w\s\-\.\(\)\[\]&]')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+_ARTIST_TITLE_PATTERNS = [
+    re.compile(r'^(.+?)\s*[-–—]\s*(.+)$'),  # Artist - Title
+    re.compile(r'^(.+?)\s*:\s*(.+)$'),      # Artist: Title
+    re.compile(r'^(.+?)\s*"\s*(.+?)\s*"'),  # Artist "Title"
+    re.compile(r"^(.+?)\s*'\s*(.+?)\s*'"),  # Artist 'Title'
+]
+
+# Leading counter of a harvested filename ("00042 - Artist - Title.mp3")
+_COUNTER_RE = re.compile(r'^(\d+)')
+
+# "HTTP Error 429: Too Many Requests" in yt-dlp error messages
+_HTTP_STATUS_RE = re.compile(r'HTTP Error (\d+)')
+
+# Downloaded videos are written to the database in batches of this size
+_DB_BATCH_SIZE = 25
+
+# Playlist Atom feed; it lists the newest entries and updates within minutes
+_RSS_FEED_URL = 'https://www.youtube.com/feeds/videos.xml'
+_FEED_NS = {
+    'atom': 'http://www.w3.org/2005/Atom',
+    'yt': 'http://www.youtube.com/xml/schemas/2015',
+}
 
 class AdvancedHarvester:
     """Advanced harvester with rate limiting detection and device rotation."""
@@ -34,6 +69,56 @@ class AdvancedHarvester:
         self.harvest_dir = Path(config.get('harvest_dir'))
         self.harvest_dir.mkdir(parents=True, exist_ok=True)
         
+        # Downloaded videos waiting to be written to the database in one batch
+        self._pending_rows = []
+        self._pending_lock = threading.Lock()
+        
+        # Per-thread YoutubeDL instances, reused across downloads. Every instance
+        # is also tracked so close_ydl_instances can write refreshed cookies
+        # back to cookies.txt; bumping the generation retires them all
+        self._ydl_local = threading.local()
+        self._ydl_instances = []
+        self._ydl_generation = 0
+        self._ydl_lock = threading.Lock()
+        
+        # Arguments common to every yt-dlp call, resolved once.
+        # Audio-only harvesting never needs the DASH/HLS manifests
+        self._base_ydl_args = ['--extractor-args', 'youtube:skip=dash,hls']
+        # Add cookies.txt if it exists
+        if Path('cookies.txt').exists():
+            self._base_ydl_args += ['--cookies', 'cookies.txt']
+        # Add ffmpeg location if specified in config
+        ffmpeg_path = config.get('ffmpeg_path')
+        if ffmpeg_path:
+            self._base_ydl_args += ['--ffmpeg-location', ffmpeg_path]
+        
+        # Split each download over several connections; aria2c can also split plain https streams
+        connections = str(config.get('concurrent_fragments', 4))
+        self._downloader_args = ['--concurrent-fragments', connections]
+        if shutil.which('aria2c'):
+            self._downloader_args += [
+                '--downloader', 'aria2c',
+                '--downloader-args', f'aria2c:-x {connections} -s {connections} -k 1M'
+            ]
+        
+        # Downloads in flight adapt to YouTube's tolerance; the cap is set per harvest
+        self._concurrency = AdaptiveConcurrency(config.get('max_concurrent_downloads', 3))
+        # Paces download starts by download_delay; set up per harvest
+        self._start_bucket = None
+        
+        # ffmpeg conversions run on their own pool; the semaphore caps how many
+        # downloaded files can wait for it
+        self._pp_workers = os.cpu_count() or 1
+        self._pp_slots = threading.BoundedSemaphore(self._pp_workers * 2)
+        
+        # Keep-alive session for Syncthing REST calls
+        self._sync_session = requests.Session()
+        self._last_rescan = None
+        
+        # Playlist feed polling: keep-alive session plus the validators of each feed
+        self._feed_session = requests.Session()
+        self._feed_validators = {}
+        
         # Initialize device if this is a main node
         if config.get('is_downloader', False):
             self._initialize_device()
@@ -47,107 +132,183 @@ class AdvancedHarvester:
         self.device_manager.register_device(device_id, device_name, device_type)
         logging.info(f"Initialized device: {device_name} ({device_id})")
     
+    def _ydl_args(self, *args: str) -> List[str]:
+        """Build yt-dlp arguments on top of the shared base arguments."""
+        return self._base_ydl_args + list(args)
+    
+    def _get_ydl(self, args: List[str]) -> yt_dlp.YoutubeDL:
+        """Return this thread's YoutubeDL instance for the given yt-dlp arguments."""
+        instances = getattr(self._ydl_local, 'instances', None)
+        if instances is None or self._ydl_local.generation != self._ydl_generation:
+            instances = self._ydl_local.instances = {}
+            self._ydl_local.generation = self._ydl_generation
+        
+        key = tuple(args)
+        ydl = instances.get(key)
+        if ydl is None:
+            options = yt_dlp.parse_options(args).ydl_opts
+            # Raise on failure so the error text reaches rate limit detection
+            options.update({
+                'quiet': True,
+                'ignoreerrors': False,
+                'logger': logging.getLogger('yt_dlp')
+            })
+            ydl = instances[key] = yt_dlp.YoutubeDL(options)
+            with self._ydl_lock:
+                self._ydl_instances.append(ydl)
+        
+        return ydl
+    
+    def close_ydl_instances(self):
+        """Close every cached YoutubeDL instance, saving rotated cookies to cookies.txt.
+        
+        Call between harvests only, never while downloads are running.
+        """
+        with self._ydl_lock:
+            instances = self._ydl_instances
+            self._ydl_instances = []
+            self._ydl_generation += 1
+        
+        for ydl in instances:
+            try:
+                ydl.close()
+            except Exception as e:
+                logging.warning(f"Failed to close yt-dlp instance: {e}")
+    
+    def iter_playlist_videos(self, playlist_url: str) -> Iterator[Dict]:
+        """Yield playlist videos as yt-dlp pages through the playlist."""
+        ydl = self._get_ydl(self._ydl_args('--flat-playlist', '--no-warnings'))
+        
+        # process=False hands back the extractor's own lazy entry generator
+        info = ydl.extract_info(playlist_url, download=False, process=False)
+        for _ in range(3):
+            # Follow redirects (e.g. watch?v=...&list=...) to the playlist itself
+            if info.get('_type') not in ('url', 'url_transparent'):
+                break
+            info = ydl.extract_info(info['url'], download=False, process=False,
+                                    ie_key=info.get('ie_key'))
+        
+        for video_data in info.get('entries') or []:
+            if not video_data or not video_data.get('id'):
+                continue
+            yield {
+                'id': video_data['id'],
+                'title': video_data.get('title') or video_data['id'],
+                'uploader': video_data.get('uploader') or 'Unknown Artist',
+                'duration': video_data.get('duration'),
+                'view_count': video_data.get('view_count'),
+                'playlist_url': playlist_url
+            }
+    
     def get_playlist_videos(self, playlist_url: str) -> List[Dict]:
         """Fetch videos from a YouTube playlist using yt-dlp."""
         try:
-            cmd = [
-                sys.executable, '-m', 'yt_dlp',
-                '--flat-playlist',
-                '--dump-json',
-                '--no-warnings',
-                playlist_url
-            ]
-            
             logging.info(f"Fetching playlist: {playlist_url}")
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            
-            videos = []
-            for line in result.stdout.strip().split('\n'):
-                if line:
-                    try:
-                        video_data = json.loads(line)
-                        videos.append({
-                            'id': video_data['id'],
-                            'title': video_data['title'],
-                            'uploader': video_data.get('uploader', 'Unknown Artist'),
-                            'duration': video_data.get('duration'),
-                            'view_count': video_data.get('view_count'),
-                            'playlist_url': playlist_url
-                        })
-                    except json.JSONDecodeError:
-                        continue
+            videos = list(self.iter_playlist_videos(playlist_url))
             
             logging.info(f"Found {len(videos)} videos in playlist")
             return videos
             
-        except subprocess.CalledProcessError as e:
+        except yt_dlp.utils.YoutubeDLError as e:
             logging.error(f"Failed to fetch playlist {playlist_url}: {e}")
             return []
     
+    def _rss_url(self, playlist_url: str) -> Optional[str]:
+        """Map a playlist URL to its YouTube feed URL."""
+        playlist_id = parse_qs(urlparse(playlist_url).query).get('list')
+        if not playlist_id:
+            return None
+        return f"{_RSS_FEED_URL}?playlist_id={playlist_id[0]}"
+    
+    def poll_playlist_feed(self, playlist_url: str) -> List[Dict]:
+        """Return the feed entries of a playlist, or [] if the feed is unchanged."""
+        rss_url = self._rss_url(playlist_url)
+        if not rss_url:
+            return []
+        
+        headers = {}
+        etag, last_modified = self._feed_validators.get(rss_url, (None, None))
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        
+        try:
+            response = self._feed_session.get(rss_url, headers=headers, timeout=30)
+            if response.status_code == 304:
+                return []
+            response.raise_for_status()
+            root = ET.fromstring(response.content)
+        except (requests.RequestException, ET.ParseError) as e:
+            logging.warning(f"Failed to poll feed for {playlist_url}: {e}")
+            return []
+        
+        self._feed_validators[rss_url] = (response.headers.get('ETag'),
+                                          response.headers.get('Last-Modified'))
+        
+        videos = []
+        for entry in root.iterfind('atom:entry', _FEED_NS):
+            video_id = entry.findtext('yt:videoId', namespaces=_FEED_NS)
+            if not video_id:
+                continue
+            videos.append({
+                'id': video_id,
+                'title': entry.findtext('atom:title', namespaces=_FEED_NS) or video_id,
+                'uploader': entry.findtext('atom:author/atom:name', namespaces=_FEED_NS) or 'Unknown Artist',
+                'duration': None,
+                'view_count': None,
+                'playlist_url': playlist_url
+            })
+        return videos
+    
+    def harvest_playlist_feeds(self) -> int:
+        """Download unseen videos announced by the playlist feeds."""
+        all_videos = {}
+        for playlist_url in self.config.get('playlist_urls', []):
+            for video in self.poll_playlist_feed(playlist_url):
+                all_videos.setdefault(video['id'], video)
+        
+        if not all_videos:
+            return 0
+        
+        return self._harvest_videos(list(all_videos.values()))
+    
     def get_unseen_videos(self, videos: List[Dict]) -> List[Dict]:
         """Filter out videos already in database."""
-        unseen = []
-        
-        for video in videos:
-            if not self.db.video_exists(video['id']):
-                unseen.append(video)
+        unseen_ids = self.db.get_unseen_ids([video['id'] for video in videos])
+        unseen = [video for video in videos if video['id'] in unseen_ids]
         
         logging.info(f"Found {len(unseen)} new videos to harvest")
         return unseen
     
+    def _scan_next_counter(self) -> int:
+        """Scan the harvest directory for the highest filename counter in use."""
+        highest = 0
+        with os.scandir(self.harvest_dir) as entries:
+            for entry in entries:
+                if not entry.name.endswith('.mp3'):
+                    continue
+                match = _COUNTER_RE.match(entry.name)
+                if match:
+                    highest = max(highest, int(match.group(1)))
+        
+        return highest + 1
+    
     def get_next_filename(self) -> str:
         """Get next available filename with zero-padded counter."""
-        existing_files = list(self.harvest_dir.glob('*.mp3'))
-        
-        if not existing_files:
-            return "00001"
-        
-        # Extract numbers from existing filenames
-        numbers = []
-        for file in existing_files:
-            match = re.match(r'^(\d+)', file.stem)
-            if match:
-                numbers.append(int(match.group(1)))
-        
-        next_num = max(numbers) + 1 if numbers else 1
+        # The counter lives in the database; the directory is only scanned to seed it
+        next_num = self.db.next_counter('next_counter', self._scan_next_counter)
         return f"{next_num:05d}"
     
     def clean_title(self, title: str) -> str:
         """Clean video title for filename with enhanced safety."""
         # Remove common YouTube suffixes
-        suffixes = [
-            r'\s*\[OFFICIAL VIDEO\]',
-            r'\s*\[OFFICIAL MUSIC VIDEO\]',
-            r'\s*\(OFFICIAL VIDEO\)',
-            r'\s*\(OFFICIAL MUSIC VIDEO\)',
-            r'\s*\[MUSIC VIDEO\]',
-            r'\s*\(MUSIC VIDEO\)',
-            r'\s*\[LYRICS\]',
-            r'\s*\(LYRICS\)',
-            r'\s*\[AUDIO\]',
-            r'\s*\(AUDIO\)',
-            r'\s*\[HQ\]',
-            r'\s*\(HQ\)',
-            r'\s*\[HD\]',
-            r'\s*\(HD\)',
-            r'\s*\[4K\]',
-            r'\s*\(4K\)',
-            r'\s*\[1080P\]',
-            r'\s*\(1080P\)',
-            r'\s*\[720P\]',
-            r'\s*\(720P\)',
-        ]
-        
-        cleaned = title
-        for suffix in suffixes:
-            cleaned = re.sub(suffix, '', cleaned, flags=re.IGNORECASE)
+        cleaned = _SUFFIX_RE.sub('', title)
         
         # Enhanced filename sanitization for cross-platform compatibility
         # Remove/replace invalid filename characters for Windows/Unix
-        cleaned = re.sub(r'[<>:"/\\|?*]', '', cleaned)
-        cleaned = re.sub(r'[\x00-\x1f\x7f-\x9f]', '', cleaned)  # Remove control characters
-        cleaned = re.sub(r'[^\w\s\-\.\(\)\[\]&]', '', cleaned)  # Keep only safe characters
-        cleaned = re.sub(r'\s+', ' ', cleaned)  # Normalize whitespace
+        cleaned = _UNSAFE_CHAR_RE.sub('', cleaned)  # Also drops control characters
+        cleaned = _WHITESPACE_RE.sub(' ', cleaned)  # Normalize whitespace
         cleaned = cleaned.strip('. ')  # Remove leading/trailing dots and spaces
         
         # Ensure filename isn't empty and isn't too long
@@ -161,23 +322,21 @@ class AdvancedHarvester:
     def extract_artist_title(self, title: str, uploader: str) -> Tuple[str, str]:
         """Extract artist and title from video title."""
         # Common patterns: "Artist - Title" or "Title - Artist"
-        patterns = [
-            r'^(.+?)\s*[-–—]\s*(.+)$',  # Artist - Title
-            r'^(.+?)\s*:\s*(.+)$',      # Artist: Title
-            r'^(.+?)\s*"\s*(.+?)\s*"',  # Artist "Title"
-            r"^(.+?)\s*'\s*(.+?)\s*'",  # Artist 'Title'
-        ]
-        
-        for pattern in patterns:
-            match = re.match(pattern, title)
+        for pattern in _ARTIST_TITLE_PATTERNS:
+            match = pattern.match(title)
             if match:
                 return match.group(1).strip(), match.group(2).strip()
         
         # Fallback: use uploader as artist
         return uploader, title
     
-    def download_video(self, video: Dict) -> Optional[Dict]:
-        """Download a video with rate limiting detection and fallback."""
+    def download_video(self, video: Dict, pp_pool: Optional[ThreadPoolExecutor] = None):
+        """Download a video with rate limiting detection and fallback.
+        
+        Without pp_pool the audio is converted inline and the result dict (or
+        None) is returned. With pp_pool the conversion is handed to that pool
+        and its Future is returned, freeing this thread for the next download.
+        """
         video_id = video['id']
         title = video['title']
         uploader = video['uploader']
@@ -199,34 +358,39 @@ class AdvancedHarvester:
             ('96k', 'bestaudio[ext=m4a]/bestaudio')
         ]
         
+        # ID3 tags are written by ffmpeg during encoding; meta_* fields override yt-dlp's metadata
+        tags = {
+            'meta_title': clean_title,
+            'meta_artist': artist,
+            'meta_album': 'Project 5001',
+            'meta_Source': f'YouTube • {video_id}',
+            'meta_Harvested': datetime.now().isoformat()
+        }
+        
         for quality, format_spec in quality_settings:
-            success, result = self._attempt_download(
-                video_id, filepath, format_spec, quality
-            )
+            with self._concurrency:
+                success, result = self._attempt_download(video_id, format_spec, tags)
+            # One detection feeds both the concurrency limit and the rotation decision
+            rate_limit_type = None if success else self.rate_detector.detect_rate_limit(
+                result.get('error', ''), result.get('http_status'), result.get('download_speed'))
+            self._concurrency.record(success, rate_limit_type == 'http_429')
             
             if success:
-                # Tag the file
-                self._tag_file(filepath, artist, clean_title, video_id)
+                job = (video, result, artist, filename, filepath, quality)
+                if pp_pool is None:
+                    return self._postprocess_video(*job)
                 
-                # Update database
-                self.db.add_video(
-                    video_id, title, artist, filename, video['playlist_url'],
-                    result.get('file_size'), result.get('duration'), quality
-                )
-                
-                logging.info(f"Successfully downloaded: {filename} ({quality})")
-                return {
-                    'filename': filename,
-                    'quality': quality,
-                    'file_size': result.get('file_size'),
-                    'duration': result.get('duration')
-                }
+                # Bound the downloaded files waiting for ffmpeg
+                self._pp_slots.acquire()
+                future = pp_pool.submit(self._postprocess_video, *job)
+                future.add_done_callback(lambda _: self._pp_slots.release())
+                return future
             
             # Check if we should rotate devices
-            if self.rate_detector.handle_download_failure(
+            if self.rate_detector.handle_detected_failure(
+                rate_limit_type,
                 result.get('error', ''), 
-                result.get('http_status'),
-                result.get('download_speed')
+                result.get('http_status')
             ):
                 logging.info("Device rotated, retrying download")
                 continue
@@ -236,57 +400,51 @@ class AdvancedHarvester:
         logging.error(f"Failed to download {video_id} after all attempts")
         return None
     
-    def _attempt_download(self, video_id: str, filepath: Path, format_spec: str, 
-                         quality: str) -> Tuple[bool, Dict]:
-        """Attempt to download a video with specific settings."""
+    def _attempt_download(self, video_id: str, format_spec: str,
+                         tags: Dict[str, str] = None) -> Tuple[bool, Dict]:
+        """Attempt to download a video's audio stream, without converting it."""
+        if self._start_bucket:
+            self._start_bucket.acquire()
+        
         try:
-            cmd = [
-                sys.executable, '-m', 'yt_dlp',
+            # Download under a temporary id-based name; _postprocess_video moves it into place
+            ydl = self._get_ydl(self._ydl_args(
                 '-f', format_spec,
-                '--extract-audio',
-                '--audio-format', 'mp3',
-                '--audio-quality', quality,
-                '--embed-thumbnail',
-                '--embed-metadata',
-                '--output', str(filepath),
+                *self._downloader_args,
+                '--write-thumbnail',
+                '--output', str(self.harvest_dir / '.%(id)s.%(ext)s'),
                 '--no-warnings',
-                '--newline',
-                f'https://www.youtube.com/watch?v={video_id}'
-            ]
-            # Add cookies.txt if it exists
-            if Path('cookies.txt').exists():
-                cmd.insert(1, '--cookies')
-                cmd.insert(2, 'cookies.txt')
-            # Add ffmpeg location if specified in config
-            ffmpeg_path = self.config.get('ffmpeg_path')
-            if ffmpeg_path:
-                cmd.insert(1, '--ffmpeg-location')
-                cmd.insert(2, ffmpeg_path)
+                '--no-progress',
+                '--socket-timeout', '30'
+            ))
             
             start_time = time.time()
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
+            info = ydl.extract_info(f'https://www.youtube.com/watch?v={video_id}', download=True,
+                                    extra_info=tags or {})
             end_time = time.time()
             
-            if result.returncode == 0 and filepath.exists():
-                file_size = filepath.stat().st_size
+            downloads = info.get('requested_downloads') or [{}]
+            downloaded = downloads[0].get('filepath')
+            if downloaded and Path(downloaded).exists():
+                file_size = Path(downloaded).stat().st_size
                 download_speed = file_size / (end_time - start_time) if (end_time - start_time) > 0 else 0
                 
                 return True, {
-                    'file_size': file_size,
-                    'duration': None,  # Could extract from metadata
+                    'info': downloads[0],
+                    'duration': info.get('duration'),
                     'download_speed': download_speed
                 }
             else:
                 return False, {
-                    'error': result.stderr,
-                    'http_status': self._extract_http_status(result.stderr),
+                    'error': 'Downloaded file not found',
+                    'http_status': None,
                     'download_speed': 0
                 }
                 
-        except subprocess.TimeoutExpired:
+        except yt_dlp.utils.DownloadError as e:
             return False, {
-                'error': 'Download timeout',
-                'http_status': None,
+                'error': str(e),
+                'http_status': self._error_http_status(e),
                 'download_speed': 0
             }
         except Exception as e:
@@ -296,52 +454,110 @@ class AdvancedHarvester:
                 'download_speed': 0
             }
     
+    def _postprocess_video(self, video: Dict, result: Dict, artist: str, filename: str,
+                           filepath: Path, quality: str) -> Optional[Dict]:
+        """Convert a downloaded stream to tagged mp3 and record it."""
+        video_id = video['id']
+        try:
+            # yt-dlp's own postprocessors: mp3 extraction, metadata, thumbnail
+            ydl = self._get_ydl(self._ydl_args(
+                '--extract-audio',
+                '--audio-format', 'mp3',
+                '--audio-quality', quality,
+                '--embed-thumbnail',
+                '--embed-metadata',
+                '--no-warnings'
+            ))
+            info = result['info']
+            info = ydl.post_process(info['filepath'], info)
+            os.replace(info['filepath'], filepath)
+        except Exception as e:
+            logging.error(f"Failed to convert {video_id}: {e}")
+            for leftover in self.harvest_dir.glob(f'.{video_id}.*'):
+                leftover.unlink(missing_ok=True)
+            return None
+        
+        file_size = filepath.stat().st_size
+        
+        # Queue the database update; flushed in batches by _harvest_videos
+        self._queue_video_row((
+            video_id, video['title'], artist, filename, video['playlist_url'],
+            file_size, result.get('duration'), quality
+        ))
+        
+        logging.info(f"Successfully downloaded: {filename} ({quality})")
+        return {
+            'filename': filename,
+            'quality': quality,
+            'file_size': file_size,
+            'duration': result.get('duration')
+        }
+    
+    def _queue_video_row(self, row: Tuple):
+        """Buffer a downloaded video's row, flushing once enough have piled up."""
+        with self._pending_lock:
+            self._pending_rows.append(row)
+            flush = len(self._pending_rows) >= _DB_BATCH_SIZE
+        
+        if flush:
+            self.flush_video_rows()
+    
+    def flush_video_rows(self):
+        """Write all buffered video rows to the database in one transaction."""
+        with self._pending_lock:
+            rows, self._pending_rows = self._pending_rows, []
+        
+        if rows and not self.db.add_videos(rows):
+            # Keep the rows so the next flush can retry them
+            with self._pending_lock:
+                self._pending_rows[:0] = rows
+    
+    def _error_http_status(self, error: Exception) -> Optional[int]:
+        """Get the HTTP status from a yt-dlp exception chain, falling back to its message."""
+        seen = set()
+        pending = [error]
+        while pending:
+            exc = pending.pop()
+            if exc is None or id(exc) in seen:
+                continue
+            seen.add(id(exc))
+            
+            # yt-dlp's HTTPError (and urllib's) carry the response status directly
+            status = getattr(exc, 'status', None)
+            if isinstance(status, int):
+                return status
+            
+            exc_info = getattr(exc, 'exc_info', None)
+            pending.extend([
+                exc.__cause__,
+                getattr(exc, 'cause', None),
+                exc_info[1] if exc_info else None
+            ])
+        
+        return self._extract_http_status(str(error))
+    
     def _extract_http_status(self, error_output: str) -> Optional[int]:
         """Extract HTTP status code from error output."""
-        if not error_output:
+        # Cheap substring test first; most failures (timeouts, SSL) carry no status
+        if not error_output or 'HTTP Error' not in error_output:
             return None
         
         # Look for HTTP status codes
-        status_match = re.search(r'HTTP Error (\d+)', error_output)
+        status_match = _HTTP_STATUS_RE.search(error_output)
         if status_match:
             return int(status_match.group(1))
         
         return None
     
-    def _tag_file(self, filepath: Path, artist: str, title: str, video_id: str):
-        """Add metadata tags to audio file."""
-        try:
-            import mutagen
-            
-            if filepath.suffix.lower() == '.mp3':
-                from mutagen.id3 import ID3, TIT2, TPE1, TXXX, TALB
-                
-                audio = mutagen.File(filepath)
-                if audio is None:
-                    audio = mutagen.File(filepath, options=[mutagen.id3.ID3])
-                
-                if audio.tags is None:
-                    audio.tags = ID3()
-                
-                audio.tags.add(TIT2(encoding=3, text=title))
-                audio.tags.add(TPE1(encoding=3, text=artist))
-                audio.tags.add(TALB(encoding=3, text='Project 5001'))
-                audio.tags.add(TXXX(encoding=3, desc='Source', text=f'YouTube • {video_id}'))
-                audio.tags.add(TXXX(encoding=3, desc='Harvested', text=datetime.now().isoformat()))
-                
-                audio.save()
-                logging.debug(f"Tagged {filepath.name}")
-                
-        except ImportError:
-            logging.warning("mutagen not available, skipping tagging")
-        except Exception as e:
-            logging.error(f"Failed to tag {filepath}: {e}")
-    
     def trigger_syncthing_rescan(self):
-        """Trigger Syncthing to rescan the folder."""
+        """Trigger Syncthing to rescan the folder (at most once every 30 seconds)."""
         if not self.config.get('syncthing.enabled'):
             return
         
+        if self._last_rescan is not None and time.monotonic() - self._last_rescan < 30:
+            logging.debug("Skipping Syncthing rescan, one was triggered recently")
+            return
+        
         api_url = self.config.get('syncthing.api_url')
         api_key = self.config.get('syncthing.api_key')
         folder_id = self.config.get('syncthing.folder_id')
@@ -351,12 +567,13 @@ class AdvancedHarvester:
             return
         
         try:
-            headers = {'X-API-Key': api_key}
+            self._sync_session.headers['X-API-Key'] = api_key
             url = f"{api_url}/rest/db/scan"
             params = {'folder': folder_id}
             
-            response = requests.post(url, headers=headers, params=params, timeout=10)
+            response = self._sync_session.post(url, params=params, timeout=10)
             response.raise_for_status()
+            self._last_rescan = time.monotonic()
             
             logging.info("Triggered Syncthing rescan")
             
@@ -372,46 +589,74 @@ class AdvancedHarvester:
         if not videos:
             return 0
         
+        return self._harvest_videos(videos)
+    
+    def _harvest_videos(self, videos: List[Dict]) -> int:
+        """Download the unseen videos from an already fetched video list."""
         # Filter unseen videos
         unseen_videos = self.get_unseen_videos(videos)
         if not unseen_videos:
             logging.info("No new videos to harvest")
             return 0
         
-        # Download videos with concurrency control
-        max_concurrent = self.config.get('max_concurrent_downloads', 3)
+        # Download videos with concurrency control (HARVEST_CONCURRENCY overrides the config);
+        # max_concurrent is the ceiling, the adaptive limit decides how many actually run
+        max_concurrent = int(os.getenv('HARVEST_CONCURRENCY') or self.config.get('max_concurrent_downloads', 3))
         download_delay = self.config.get('download_delay', 2)
+        self._concurrency.set_cap(max_concurrent)
+        self._start_bucket = TokenBucket(1 / download_delay, max_concurrent) if download_delay > 0 else None
         
         downloaded_count = 0
         
-        with ThreadPoolExecutor(max_workers=max_concurrent) as executor:
+        # Network-bound downloads and CPU-bound ffmpeg conversions run in separate pools
+        with ThreadPoolExecutor(max_workers=max_concurrent) as executor, \
+                ThreadPoolExecutor(max_workers=self._pp_workers) as pp_pool:
             # Submit download tasks
             future_to_video = {
-                executor.submit(self.download_video, video): video 
+                executor.submit(self.download_video, video, pp_pool): video 
                 for video in unseen_videos
             }
             
-            # Process completed downloads
+            # Collect the conversion started by each completed download
+            pp_future_to_video = {}
             for future in as_completed(future_to_video):
                 video = future_to_video[future]
                 try:
-                    result = future.result()
-                    if result:
-                        downloaded_count += 1
-                        logging.info(f"Downloaded {downloaded_count}/{len(unseen_videos)}: {video['title']}")
-                    
-                    # Add delay between downloads
-                    time.sleep(download_delay)
+                    pp_future = future.result()
+                    if pp_future:
+                        pp_future_to_video[pp_future] = video
                     
                 except Exception as e:
                     logging.error(f"Download failed for {video['title']}: {e}")
+            
+            # Process completed conversions
+            for future in as_completed(pp_future_to_video):
+                video = pp_future_to_video[future]
+                try:
+                    if future.result():
+                        downloaded_count += 1
+                        logging.info(f"Downloaded {downloaded_count}/{len(unseen_videos)}: {video['title']}")
+                except Exception as e:
+                    logging.error(f"Conversion failed for {video['title']}: {e}")
+        
+        self.flush_video_rows()
         
         if downloaded_count > 0:
-            logging.info(f"Harvested {downloaded_count} new videos from playlist")
-            self.trigger_syncthing_rescan()
+            logging.info(f"Harvested {downloaded_count} new videos")
         
         return downloaded_count
     
+    async def _fetch_all_playlists(self, playlist_urls: List[str]) -> List:
+        """Fetch every playlist's entries concurrently, at most four at a time."""
+        semaphore = asyncio.Semaphore(4)
+        
+        async def fetch(playlist_url: str) -> List[Dict]:
+            async with semaphore:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(None, self.get_playlist_videos, playlist_url)
+        
+        return await asyncio.gather(*(fetch(url) for url in playlist_urls), return_exceptions=True)
+    
     def harvest_all_playlists(self) -> int:
         """Harvest all configured playlists."""
         playlist_urls = self.config.get('playlist_urls', [])
@@ -420,20 +665,26 @@ class AdvancedHarvester:
             logging.warning("No playlist URLs configured")
             return 0
         
-        total_downloaded = 0
+        # Resolve all playlists at once, then feed one combined list to the download pipeline
+        results = asyncio.run(self._fetch_all_playlists(playlist_urls))
         
-        for playlist_url in playlist_urls:
-            try:
-                downloaded = self.harvest_playlist(playlist_url)
-                total_downloaded += downloaded
-                
-                # Add delay between playlists
-                time.sleep(5)
-                
-            except Exception as e:
-                logging.error(f"Failed to harvest playlist {playlist_url}: {e}")
+        all_videos = {}
+        for playlist_url, videos in zip(playlist_urls, results):
+            if isinstance(videos, Exception):
+                logging.error(f"Failed to harvest playlist {playlist_url}: {videos}")
+                continue
+            for video in videos:
+                # A video in several playlists is only downloaded once
+                all_videos.setdefault(video['id'], video)
         
-        return total_downloaded
+        if not all_videos:
+            return 0
+        
+        try:
+            return self._harvest_videos(list(all_videos.values()))
+        except Exception as e:
+            logging.error(f"Failed to harvest playlists: {e}")
+            return 0
     
     def run_harvest_cycle(self):
         """Run a single harvest cycle."""
@@ -448,11 +699,14 @@ class AdvancedHarvester:
             
             if downloaded > 0:
                 logging.info(f"Harvest cycle completed: {downloaded} videos downloaded")
+                self.trigger_syncthing_rescan()
             else:
                 logging.info("Harvest cycle completed: no new videos")
                 
         except Exception as e:
             logging.error(f"Harvest cycle failed: {e}")
+        finally:
+            self.close_ydl_instances()
     
     def run_daemon(self):
         """Run as continuous daemon."""
@@ -470,18 +724,33 @@ class AdvancedHarvester:
             logging.error(f"Failed to create PID file: {e}")
         
         check_interval = self.config.get('check_interval', 3600)
+        feed_interval = min(self.config.get('feed_poll_interval', 300), check_interval)
+        next_full_cycle = 0.0
         
         try:
             while True:
                 try:
-                    self.run_harvest_cycle()
-                    
-                    # Log rotation status
-                    rotation_status = self.rate_detector.get_rotation_status()
-                    logging.info(f"Rotation status: {rotation_status['available_devices']}/{rotation_status['total_devices']} devices available")
+                    # Full playlist listings every check_interval; in between,
+                    # the cheap conditional feed requests pick up new videos
+                    if time.monotonic() >= next_full_cycle:
+                        self.run_harvest_cycle()
+                        next_full_cycle = time.monotonic() + check_interval
+                        
+                        # Log rotation status
+                        rotation_status = self.rate_detector.get_rotation_status()
+                        logging.info(f"Rotation status: {rotation_status['available_devices']}/{rotation_status['total_devices']} devices available")
+                    elif self.config.get('is_downloader', False):
+                        try:
+                            downloaded = self.harvest_playlist_feeds()
+                        finally:
+                            self.close_ydl_instances()
+                        if downloaded > 0:
+                            logging.info(f"Feed check completed: {downloaded} videos downloaded")
+                            self.trigger_syncthing_rescan()
                     
-                    logging.info(f"Sleeping for {check_interval} seconds")
-                    time.sleep(check_interval)
+                    sleep_for = max(0.0, min(feed_interval, next_full_cycle - time.monotonic()))
+                    logging.debug(f"Sleeping for {sleep_for:.0f} seconds")
+                    time.sleep(sleep_for)
                     
                 except KeyboardInterrupt:
                     logging.info("Harvester stopped by user")
@@ -490,6 +759,8 @@ class AdvancedHarvester:
                     logging.error(f"Harvester error: {e}")
                     time.sleep(60)  # Wait before retrying
         finally:
+            self.close_ydl_instances()
+            
             # Clean up PID file
             try:
                 if pid_file.exists():
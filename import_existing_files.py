@@ -7,9 +7,10 @@ Manually import existing MP3 files from the Harvest folder into the database.
 import os
 import sys
 import re
+import hashlib
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Optional, Tuple
+from typing import Iterator, List, Dict, Optional, Tuple, Union
 
 # Add current directory to path for imports
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -28,6 +29,27 @@ class ExistingFileImporter:
         self.db = Project5001Database(self.config)
         self.harvest_dir = Path(self.config.get('harvest_dir'))
         
+        # Directory and database snapshots shared by show_status and import_all_files
+        self._file_cache: Optional[List[os.DirEntry]] = None
+        self._db_cache: Optional[set] = None
+        
+    def refresh(self):
+        """Drop the cached directory and database snapshots; they are re-read on next use."""
+        self._file_cache = None
+        self._db_cache = None
+    
+    def _snapshot(self) -> Tuple[List[os.DirEntry], set]:
+        """Return the cached harvest files and database filenames, reading them if needed."""
+        if self._file_cache is None:
+            self._file_cache = self.get_existing_files()
+        if self._db_cache is None:
+            self._db_cache = set(self.get_database_files())
+        return self._file_cache, self._db_cache
+    
+    def _import_id(self, filename: str) -> str:
+        """Stable video ID for an imported file, derived from its filename."""
+        return "imported_" + hashlib.blake2b(filename.encode('utf-8'), digest_size=8).hexdigest()
+    
     def extract_info_from_filename(self, filename: str) -> Tuple[str, str, str]:
         """Extract artist and title from filename."""
         # Remove extension
@@ -45,34 +67,45 @@ class ExistingFileImporter:
             if match:
                 artist = match.group(1).strip()
                 title = match.group(2).strip()
-                # Generate a simple video ID from filename
-                video_id = f"imported_{hash(filename) % 1000000:06d}"
+                video_id = self._import_id(filename)
                 return video_id, artist, title
         
         # Fallback: use filename as title, "Unknown Artist" as artist
-        video_id = f"imported_{hash(filename) % 1000000:06d}"
+        video_id = self._import_id(filename)
         return video_id, "Unknown Artist", name
     
-    def get_existing_files(self) -> List[Path]:
+    def iter_existing_files(self) -> Iterator[os.DirEntry]:
+        """Yield the MP3 files in the harvest directory as directory entries."""
+        with os.scandir(self.harvest_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith('.mp3') and entry.is_file():
+                    yield entry
+    
+    def get_existing_files(self) -> List[os.DirEntry]:
         """Get all MP3 files in the harvest directory."""
         if not self.harvest_dir.exists():
             print(f"❌ Harvest directory not found: {self.harvest_dir}")
             return []
         
-        files = list(self.harvest_dir.glob('*.mp3'))
-        return files
+        return list(self.iter_existing_files())
     
     def get_database_files(self) -> List[str]:
         """Get all filenames currently in the database."""
         videos = self.db.get_all_videos()
         return [video['filename'] for video in videos]
     
-    def import_file(self, filepath: Path) -> bool:
-        """Import a single file into the database."""
+    def import_file(self, filepath: Union[Path, os.DirEntry], db_files: Optional[set] = None) -> bool:
+        """Import a single file into the database.
+        
+        Pass db_files (a set of filenames already in the database) when
+        importing many files so the table is only read once.
+        """
         filename = filepath.name
+        if db_files is None:
+            db_files = set(self.get_database_files())
         
         # Check if already in database
-        if filename in self.get_database_files():
+        if filename in db_files:
             print(f"⚠️  {filename} already in database, skipping")
             return False
         
@@ -95,6 +128,7 @@ class ExistingFileImporter:
         )
         
         if success:
+            db_files.add(filename)
             print(f"✅ Imported: {filename} ({artist} - {title})")
             return True
         else:
@@ -105,16 +139,13 @@ class ExistingFileImporter:
         """Import all existing files not in the database."""
         print("🔍 Scanning for existing files...")
         
-        files = self.get_existing_files()
+        files, db_files = self._snapshot()
         if not files:
             print("ℹ️  No MP3 files found in harvest directory")
             return 0
         
         print(f"Found {len(files)} MP3 files")
         
-        # Get files already in database
-        db_files = set(self.get_database_files())
-        
         # Filter out files already in database
         new_files = [f for f in files if f.name not in db_files]
         
@@ -128,10 +159,21 @@ class ExistingFileImporter:
         
         print(f"\n🔄 Importing {len(new_files)} files...")
         
-        imported_count = 0
+        # One transaction for the whole batch instead of a commit per file
+        rows = []
         for file in new_files:
-            if self.import_file(file):
-                imported_count += 1
+            video_id, artist, title = self.extract_info_from_filename(file.name)
+            rows.append((video_id, title, artist, file.name, "manual_import",
+                         file.stat().st_size, None, "unknown"))
+        
+        imported_count = 0
+        if self.db.add_videos(rows):
+            for video_id, title, artist, filename, *_ in rows:
+                print(f"✅ Imported: {filename} ({artist} - {title})")
+            imported_count = len(rows)
+            db_files.update(row[3] for row in rows)
+        else:
+            print(f"❌ Failed to import {len(rows)} files")
         
         print(f"\n✅ Successfully imported {imported_count}/{len(new_files)} files")
         return imported_count
@@ -140,8 +182,7 @@ class ExistingFileImporter:
         """Show current status of files vs database."""
         print("📊 File Import Status:")
         
-        files = self.get_existing_files()
-        db_files = set(self.get_database_files())
+        files, db_files = self._snapshot()
         
         print(f"Files in harvest directory: {len(files)}")
         print(f"Files in database: {len(db_files)}")
@@ -156,7 +197,8 @@ class ExistingFileImporter:
                 print(f"  📄 {file.name}")
         
         # Find database-only files (in database but not in directory)
-        db_only = [f for f in db_files if not (self.harvest_dir / f).exists()]
+        dir_files = {f.name for f in files}
+        db_only = [f for f in db_files if f not in dir_files]
         if db_only:
             print(f"\nFiles in database but missing from directory: {len(db_only)}")
             for filename in db_only:
@@ -169,6 +211,9 @@ def main():
     print("=" * 50)
     
     while True:
+        # Re-read the directory and database once per menu cycle
+        importer.refresh()
+        
         print("\nOptions:")
         print("1. Show status")
         print("2. Import all files")
@@ -9,11 +9,15 @@ import os
 import sys
 import subprocess
 import time
+import threading
 import json
+import shutil
+import importlib.util
 import platform  # Added for cross-platform compatibility
 import psutil  # Cross-platform process utilities (add to requirements)
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional, Tuple
 
 # Add current directory to path for imports
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -28,6 +32,17 @@ except ImportError as e:
     sys.exit(1)
 
 class Project5001Initializer:
+    # Directories checked by the health report, with their report keys
+    HEALTH_DIRS = (
+        ('Project5001/Harvest', 'harvest_dir'),
+        ('Project5001/Playlists', 'playlists_dir'),
+        ('Project5001/Logs', 'logs_dir')
+    )
+    
+    # Marker written after a passing quick-start health check, trusted for 5 minutes
+    HEALTH_MARKER = Path('Project5001/.health_ok')
+    HEALTH_MARKER_TTL = 300
+    
     def __init__(self):
         self.status_checker = Project5001Status()
         self.config = None
@@ -40,6 +55,60 @@ class Project5001Initializer:
         print("="*60 + "🎧")
         print()
     
+    def _probe_database(self) -> List[Tuple[str, bool, str]]:
+        """Database health probe."""
+        try:
+            stats = self.status_checker.get_database_stats()
+            if 'error' not in stats:
+                return [('database', True, f"✅ Database: {stats['total_tracks']} tracks")]
+            return [('database', False, f"❌ Database: {stats['error']}")]
+        except Exception as e:
+            return [('database', False, f"❌ Database: {e}")]
+    
+    def _probe_directories(self) -> List[Tuple[str, bool, str]]:
+        """Directory existence probes."""
+        results = []
+        for dir_path, key in self.HEALTH_DIRS:
+            if os.path.isdir(dir_path):
+                results.append((key, True, f"✅ {dir_path}: Found"))
+            else:
+                results.append((key, False, f"❌ {dir_path}: Missing"))
+        return results
+    
+    def _probe_config(self) -> List[Tuple[str, bool, str]]:
+        """Configuration probe; also loads self.config."""
+        try:
+            self.config = NodeConfig('main')
+            if self.config.validate_config():
+                return [('config', True, "✅ Configuration: Valid")]
+            return [('config', False, "❌ Configuration: Invalid")]
+        except Exception as e:
+            return [('config', False, f"❌ Configuration: {e}")]
+    
+    def _probe_dependencies(self) -> List[Tuple[str, bool, str]]:
+        """Dependency probe, checked with find_spec so no module code runs."""
+        missing = [name for name in ('yt_dlp', 'requests') if importlib.util.find_spec(name) is None]
+        if missing:
+            return [('dependencies', False, f"❌ Dependencies: Missing {', '.join(missing)}")]
+        return [('dependencies', True, "✅ Dependencies: All installed")]
+    
+    def _probe_ffmpeg(self) -> List[Tuple[str, bool, str]]:
+        """FFmpeg probe."""
+        ffmpeg_path = shutil.which('ffmpeg')
+        if ffmpeg_path:
+            return [('ffmpeg', True, f"✅ FFmpeg: {ffmpeg_path}")]
+        return [('ffmpeg', False, "❌ FFmpeg: Not found")]
+    
+    def _probe_syncthing(self) -> List[Tuple[str, bool, str]]:
+        """Syncthing API probe."""
+        try:
+            syncthing_status = self.status_checker.check_syncthing_status()
+            if syncthing_status['status'] == 'connected':
+                return [('syncthing', True, "✅ Syncthing: Connected")]
+            return [('syncthing', False, f"⚠️  Syncthing: {syncthing_status['status']}")]
+        except Exception as e:
+            return [('syncthing', False, f"❌ Syncthing: {e}")]
+    
     def check_system_health(self) -> Dict:
         """Check overall system health."""
         print("🔍 Checking system health...")
@@ -54,106 +123,75 @@ class Project5001Initializer:
             'syncthing': False
         }
         
-        # Check database
-        try:
-            stats = self.status_checker.get_database_stats()
-            if 'error' not in stats:
-                health_report['database'] = True
-                print(f"✅ Database: {stats['total_tracks']} tracks")
-            else:
-                print(f"❌ Database: {stats['error']}")
-        except Exception as e:
-            print(f"❌ Database: {e}")
-        
-        # Check directories
-        dirs_to_check = [
-            ('Project5001/Harvest', 'harvest_dir'),
-            ('Project5001/Playlists', 'playlists_dir'),
-            ('Project5001/Logs', 'logs_dir')
+        # The probes are independent I/O (SQLite, filesystem, Syncthing HTTP), so run
+        # them concurrently and print the results in a fixed order afterwards
+        probes = [
+            self._probe_database,
+            self._probe_directories,
+            self._probe_config,
+            self._probe_dependencies,
+            self._probe_ffmpeg,
+            self._probe_syncthing
         ]
+        with ThreadPoolExecutor(max_workers=len(probes)) as executor:
+            results = list(executor.map(lambda probe: probe(), probes))
         
-        for dir_path, key in dirs_to_check:
-            if Path(dir_path).exists():
-                health_report[key] = True
-                print(f"✅ {dir_path}: Found")
-            else:
-                print(f"❌ {dir_path}: Missing")
-        
-        # Check configuration
-        try:
-            self.config = NodeConfig('main')
-            if self.config.validate_config():
-                health_report['config'] = True
-                print("✅ Configuration: Valid")
-            else:
-                print("❌ Configuration: Invalid")
-        except Exception as e:
-            print(f"❌ Configuration: {e}")
-        
-        # Check dependencies
-        try:
-            import yt_dlp
-            import mutagen
-            import requests
-            health_report['dependencies'] = True
-            print("✅ Dependencies: All installed")
-        except ImportError as e:
-            print(f"❌ Dependencies: Missing {e}")
+        for probe_results in results:
+            for key, ok, message in probe_results:
+                print(message)
+                if key in health_report:
+                    health_report[key] = ok
+                
+                if key == 'ffmpeg' and not ok:
+                    self._install_ffmpeg()
         
-        # Check ffmpeg
+        return health_report
+    
+    def _install_ffmpeg(self):
+        """Install FFmpeg automatically after a failed probe."""
+        print("   Installing automatically...")
         try:
-            ffmpeg_path = shutil.which('ffmpeg')
-            if ffmpeg_path:
-                print(f"✅ FFmpeg: {ffmpeg_path}")
+            from ffmpeg_installer import FFmpegInstaller
+            installer = FFmpegInstaller()
+            if installer.install_ffmpeg():
+                print("✅ FFmpeg: Installed successfully")
             else:
-                print("❌ FFmpeg: Not found")
-                print("   Installing automatically...")
-                try:
-                    from ffmpeg_installer import FFmpegInstaller
-                    installer = FFmpegInstaller()
-                    if installer.install_ffmpeg():
-                        print("✅ FFmpeg: Installed successfully")
-                    else:
-                        print("❌ FFmpeg: Automatic installation failed")
-                except ImportError:
-                    print("❌ FFmpeg: Installer not available")
+                print("❌ FFmpeg: Automatic installation failed")
+        except ImportError:
+            print("❌ FFmpeg: Installer not available")
         except Exception as e:
             print(f"❌ FFmpeg: {e}")
-        
-        # Check Syncthing
-        try:
-            syncthing_status = self.status_checker.check_syncthing_status()
-            if syncthing_status['status'] == 'connected':
-                health_report['syncthing'] = True
-                print("✅ Syncthing: Connected")
-            else:
-                print(f"⚠️  Syncthing: {syncthing_status['status']}")
-        except Exception as e:
-            print(f"❌ Syncthing: {e}")
-        
-        return health_report
     
     def setup_system(self):
         """Run initial system setup."""
         print("\n🏗️  Running system setup...")
         
         # Check if setup has been run before
-        if Path('config/main-node.json').exists():
+        if NodeConfig.config_exists('main'):
             print("⚠️  Configuration already exists. Run setup again? (y/N): ", end="")
             if input().lower() != 'y':
                 print("Setup cancelled.")
                 return
         
         try:
-            # Run the setup script
-            result = subprocess.run([sys.executable, 'setup_project5001.py'], 
-                                  capture_output=True, text=True)
+            # Run the setup in-process; it is interactive, so its prompts must reach the user
+            try:
+                import setup_project5001
+                run_setup = setup_project5001.main
+            except (ImportError, AttributeError):
+                run_setup = None
             
-            if result.returncode == 0:
+            if run_setup is not None:
+                success = run_setup()
+            else:
+                # Fall back to running the script, without capturing its output
+                result = subprocess.run([sys.executable, 'setup_project5001.py'])
+                success = result.returncode == 0
+            
+            if success:
                 print("✅ System setup completed successfully!")
             else:
-                print("❌ Setup failed:")
-                print(result.stderr)
+                print("❌ Setup failed")
                 
         except Exception as e:
             print(f"❌ Setup error: {e}")
@@ -174,27 +212,48 @@ class Project5001Initializer:
         except Exception as e:
             print(f"❌ Failed to start harvester: {e}")
         
-        # Generate initial playlists
-        print("Generating initial playlists...")
-        try:
-            generator = PlaylistGenerator()
-            generator.generate_all_playlists()
-            print("✅ Initial playlists generated")
-        except Exception as e:
-            print(f"❌ Failed to generate playlists: {e}")
+        # Generate initial playlists in the background unless they are recent
+        if self._playlists_are_fresh():
+            print("ℹ️  Playlists are up to date, skipping generation")
+        else:
+            print("Generating initial playlists in the background...")
+            threading.Thread(target=self._generate_playlists, name='playlist-generation').start()
         
         print("\n🎉 Project 5001 is now running!")
         print("Use 'python cli.py' to manage the system")
         print("Use 'python status.py' to check status")
     
+    def _playlists_are_fresh(self, max_age: int = 3600) -> bool:
+        """Check whether an .m3u playlist was written within the last max_age seconds."""
+        cutoff_time = time.time() - max_age
+        try:
+            with os.scandir("Project5001/Playlists") as entries:
+                return any(entry.name.endswith('.m3u') and entry.stat().st_mtime >= cutoff_time
+                           for entry in entries)
+        except OSError:
+            return False
+    
+    def _generate_playlists(self):
+        """Generate all playlists; runs on a background thread."""
+        try:
+            # The generator's SQLite connection must be created on this thread
+            with PlaylistGenerator() as generator:
+                generator.generate_all_playlists()
+            print("✅ Initial playlists generated")
+        except Exception as e:
+            print(f"❌ Failed to generate playlists: {e}")
+    
     def stop_services(self):
         """Stop all Project 5001 services."""
         print("\n⏹️  Stopping Project 5001 services...")
         
+        # Services are going down; the next quick start must re-check health
+        self.HEALTH_MARKER.unlink(missing_ok=True)
+        
         try:
             # Find and stop harvester processes (cross-platform)
             harvester_processes = []
-            for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
+            for proc in psutil.process_iter(['pid', 'cmdline']):
                 try:
                     if 'harvester_v2.py' in ' '.join(proc.info['cmdline'] or []):
                         harvester_processes.append(proc)
@@ -205,11 +264,21 @@ class Project5001Initializer:
                 for proc in harvester_processes:
                     try:
                         proc.terminate()  # Graceful termination
-                        proc.wait(timeout=5)  # Wait up to 5 seconds
-                        print(f"✅ Stopped harvester process {proc.pid}")
-                    except psutil.TimeoutExpired:
+                    except psutil.NoSuchProcess:
+                        pass
+                    except Exception as e:
+                        print(f"⚠️  Could not stop process {proc.pid}: {e}")
+                
+                # Wait for all of them together, up to 5 seconds
+                gone, alive = psutil.wait_procs(harvester_processes, timeout=5)
+                for proc in gone:
+                    print(f"✅ Stopped harvester process {proc.pid}")
+                for proc in alive:
+                    try:
                         proc.kill()  # Force kill if needed
                         print(f"✅ Force stopped harvester process {proc.pid}")
+                    except psutil.NoSuchProcess:
+                        print(f"✅ Stopped harvester process {proc.pid}")
                     except Exception as e:
                         print(f"⚠️  Could not stop process {proc.pid}: {e}")
             else:
@@ -225,10 +294,30 @@ class Project5001Initializer:
         time.sleep(2)
         self.start_services()
     
+    def _health_marker_age(self) -> float:
+        """Seconds since the last passing quick-start health check (inf if unknown)."""
+        try:
+            return time.time() - float(self.HEALTH_MARKER.read_text())
+        except (OSError, ValueError):
+            return float('inf')
+    
+    def _write_health_marker(self):
+        """Record that the critical health checks just passed."""
+        try:
+            self.HEALTH_MARKER.write_text(str(time.time()))
+        except OSError:
+            pass
+    
     def quick_start(self):
         """Quick start - check health and start if ready."""
         print("\n⚡ Quick Start Mode")
         
+        # A recent passing health check is trusted without re-running the probes
+        if self._health_marker_age() < self.HEALTH_MARKER_TTL:
+            print("✅ System passed a health check recently, starting services...")
+            self.start_services()
+            return
+        
         health = self.check_system_health()
         
         # Check if system is ready
@@ -236,6 +325,7 @@ class Project5001Initializer:
         ready = all(health[check] for check in critical_checks)
         
         if ready:
+            self._write_health_marker()
             print("\n✅ System is ready! Starting services...")
             self.start_services()
         else:
@@ -267,9 +357,7 @@ class Project5001Initializer:
         choice = input("\nEnter choice: ").strip()
         
         if choice == '0':
-            for name, task in tasks:
-                print(f"\n🔄 Running: {name}")
-                task()
+            self._run_all_tasks(tasks)
         elif choice.isdigit() and 1 <= int(choice) <= len(tasks):
             name, task = tasks[int(choice) - 1]
             print(f"\n🔄 Running: {name}")
@@ -279,64 +367,93 @@ class Project5001Initializer:
         else:
             print("❌ Invalid choice")
     
+    def _run_all_tasks(self, tasks: List[Tuple[str, Callable]]):
+        """Run every maintenance task, overlapping the independent I/O-bound ones.
+        
+        Playlist generation runs on this thread while the others run on a pool;
+        each pooled task collects its messages, which are printed in task order afterwards.
+        """
+        serial = [(name, task) for name, task in tasks if task == self.generate_playlists]
+        parallel = [(name, task) for name, task in tasks if task != self.generate_playlists]
+        
+        def run_collected(task: Callable) -> List[str]:
+            lines = []
+            task(emit=lines.append)
+            return lines
+        
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = [executor.submit(run_collected, task) for _, task in parallel]
+            
+            for name, task in serial:
+                print(f"\n🔄 Running: {name}")
+                task()
+            
+            outputs = [future.result() for future in futures]
+        
+        for (name, _), lines in zip(parallel, outputs):
+            print(f"\n🔄 Running: {name}")
+            for line in lines:
+                print(line)
+    
     def generate_playlists(self):
         """Generate all playlists."""
         try:
-            generator = PlaylistGenerator()
-            generator.generate_all_playlists()
+            with PlaylistGenerator() as generator:
+                generator.generate_all_playlists()
             print("✅ All playlists generated successfully!")
         except Exception as e:
             print(f"❌ Failed to generate playlists: {e}")
     
-    def check_database_integrity(self):
-        """Check database integrity."""
+    def check_database_integrity(self, emit: Callable[[str], None] = print):
+        """Check database integrity; messages go to emit."""
         try:
             stats = self.status_checker.get_database_stats()
             if 'error' not in stats:
-                print(f"✅ Database integrity check passed")
-                print(f"  Total tracks: {stats['total_tracks']}")
-                print(f"  Recent tracks: {stats['recent_tracks']}")
+                emit(f"✅ Database integrity check passed")
+                emit(f"  Total tracks: {stats['total_tracks']}")
+                emit(f"  Recent tracks: {stats['recent_tracks']}")
             else:
-                print(f"❌ Database integrity check failed: {stats['error']}")
+                emit(f"❌ Database integrity check failed: {stats['error']}")
         except Exception as e:
-            print(f"❌ Database check failed: {e}")
+            emit(f"❌ Database check failed: {e}")
     
-    def clean_old_logs(self):
-        """Clean old log files."""
+    def clean_old_logs(self, emit: Callable[[str], None] = print):
+        """Clean old log files; messages go to emit."""
         try:
             logs_dir = Path("Project5001/Logs")
             if not logs_dir.exists():
-                print("ℹ️  No logs directory found")
+                emit("ℹ️  No logs directory found")
                 return
             
             # Keep logs from last 30 days
             cutoff_time = time.time() - (30 * 24 * 60 * 60)
             deleted_count = 0
             
-            for log_file in logs_dir.glob('*.log'):
-                if log_file.stat().st_mtime < cutoff_time:
-                    log_file.unlink()
-                    deleted_count += 1
+            with os.scandir(logs_dir) as entries:
+                for entry in entries:
+                    if entry.name.endswith('.log') and entry.stat().st_mtime < cutoff_time:
+                        os.unlink(entry.path)
+                        deleted_count += 1
             
-            print(f"✅ Cleaned {deleted_count} old log files")
+            emit(f"✅ Cleaned {deleted_count} old log files")
         except Exception as e:
-            print(f"❌ Failed to clean logs: {e}")
+            emit(f"❌ Failed to clean logs: {e}")
     
-    def update_config(self):
-        """Update configuration."""
-        print("⚠️  Configuration update not yet implemented")
-        print("Edit config files manually or run setup_project5001.py")
+    def update_config(self, emit: Callable[[str], None] = print):
+        """Update configuration; messages go to emit."""
+        emit("⚠️  Configuration update not yet implemented")
+        emit("Edit config files manually or run setup_project5001.py")
     
-    def test_syncthing(self):
-        """Test Syncthing connection."""
+    def test_syncthing(self, emit: Callable[[str], None] = print):
+        """Test Syncthing connection; messages go to emit."""
         try:
             status = self.status_checker.check_syncthing_status()
             if status['status'] == 'connected':
-                print("✅ Syncthing connection successful")
+                emit("✅ Syncthing connection successful")
             else:
-                print(f"❌ Syncthing connection failed: {status.get('message', 'Unknown error')}")
+                emit(f"❌ Syncthing connection failed: {status.get('message', 'Unknown error')}")
         except Exception as e:
-            print(f"❌ Syncthing test failed: {e}")
+            emit(f"❌ Syncthing test failed: {e}")
     
     def show_status(self):
         """Show system status."""
@@ -378,24 +495,21 @@ def main():
     # Command line mode
     command = sys.argv[1]
     
-    if command == '--setup':
-        initializer.setup_system()
-    elif command == '--start':
-        initializer.start_services()
-    elif command == '--stop':
-        initializer.stop_services()
-    elif command == '--restart':
-        initializer.restart_services()
-    elif command == '--status':
-        initializer.show_status()
-    elif command == '--health':
-        initializer.check_system_health()
-    elif command == '--maintenance':
-        initializer.maintenance_mode()
-    elif command == '--quick':
-        initializer.quick_start()
-    elif command == '--help':
-        initializer.show_help()
+    commands = {
+        '--setup': initializer.setup_system,
+        '--start': initializer.start_services,
+        '--stop': initializer.stop_services,
+        '--restart': initializer.restart_services,
+        '--status': initializer.show_status,
+        '--health': initializer.check_system_health,
+        '--maintenance': initializer.maintenance_mode,
+        '--quick': initializer.quick_start,
+        '--help': initializer.show_help
+    }
+    
+    handler = commands.get(command)
+    if handler:
+        handler()
     else:
         print(f"❌ Unknown command: {command}")
         print("Use --help for available commands")
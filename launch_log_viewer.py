@@ -1,15 +1,35 @@
 #!/usr/bin/env python3
 """
 Project 5001 - Log Viewer Launcher
-Launches the real-time log viewer in a new terminal window.
+Launches the real-time log viewer in a new terminal window, or in the
+current one when run from a terminal (pass --detach to force a new window).
 """
 
 import os
 import sys
 import subprocess
+import shutil
 import platform
 from pathlib import Path
 
+# Remembers which Linux terminal emulator worked last time
+_TERMINAL_CACHE = Path.home() / '.cache' / 'project5001' / 'terminal'
+
+def _read_cached_terminal() -> str:
+    """Return the cached terminal emulator name, or '' if none."""
+    try:
+        return _TERMINAL_CACHE.read_text().strip()
+    except OSError:
+        return ''
+
+def _cache_terminal(name: str):
+    """Remember the terminal emulator that launched successfully."""
+    try:
+        _TERMINAL_CACHE.parent.mkdir(parents=True, exist_ok=True)
+        _TERMINAL_CACHE.write_text(name)
+    except OSError:
+        pass
+
 def launch_log_viewer():
     """Launch the log viewer in a new terminal window."""
     script_path = Path(__file__).parent / "view_harvester_logs.py"
@@ -45,9 +65,17 @@ def launch_log_viewer():
                 ["xfce4-terminal", "-e", f"python3 {script_path}"]
             ]
             
+            # Try the one that worked last time first, and skip any not on PATH
+            cached = _read_cached_terminal()
+            terminals.sort(key=lambda cmd: cmd[0] != cached)
+            
             for terminal_cmd in terminals:
+                if not shutil.which(terminal_cmd[0]):
+                    continue
                 try:
                     subprocess.Popen(terminal_cmd)
+                    if terminal_cmd[0] != cached:
+                        _cache_terminal(terminal_cmd[0])
                     break
                 except FileNotFoundError:
                     continue
@@ -64,5 +92,19 @@ def launch_log_viewer():
         print("Run manually: python view_harvester_logs.py")
         return False
 
+def run_inline():
+    """Replace this process with the log viewer (used when already in a terminal)."""
+    script_path = Path(__file__).parent / "view_harvester_logs.py"
+    
+    if not script_path.exists():
+        print("❌ Log viewer script not found!")
+        return False
+    
+    os.execv(sys.executable, [sys.executable, str(script_path)])
+
 if __name__ == "__main__":
-    launch_log_viewer() 
\ No newline at end of file
+    # Already in a terminal (e.g. over SSH): no need for a new window
+    if sys.stdout.isatty() and '--detach' not in sys.argv:
+        run_inline()
+    else:
+        launch_log_viewer() 
\ No newline at end of file
@@ -5,12 +5,18 @@ Standalone script for managing YouTube playlists that the harvester monitors.
 """
 
 import os
+import re
 import sys
 import json
-import subprocess
+import time
 import logging
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+
+import yt_dlp
 
 # Add current directory to path for imports
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -22,6 +28,38 @@ except ImportError as e:
     print("Make sure you're running this from the Project 5001 directory")
     sys.exit(1)
 
+# Cheap sanity check before handing a URL to yt-dlp
+_PLAYLIST_URL_RE = re.compile(
+    r'^https?://(?:www\.|m\.|music\.)?youtube\.com/playlist\?(?:\S*&)?list=[A-Za-z0-9_-]{10,}(?:&\S*)?$'
+)
+
+# Just the first entry is listed; the playlist fields come with it
+_YDL_OPTS = {
+    'quiet': True,
+    'no_warnings': True,
+    'extract_flat': 'in_playlist',
+    'playlist_items': '1',
+    'skip_download': True,
+    'socket_timeout': 30,
+    'logger': logging.getLogger('yt_dlp'),
+}
+
+# One YoutubeDL per thread, reused for every lookup
+_ydl_local = threading.local()
+
+# Playlist info cached on disk: {url: {'info': {...} or None, 'ts': epoch, 'ttl': seconds}}
+_CACHE_FILE = Path('Project5001/Cache/playlist_info.json')
+_CACHE_TTL = 3600  # successful lookups
+_FAILURE_TTL = 60  # failed lookups, so a flaky network isn't retried on every call
+_cache = None
+_cache_lock = threading.Lock()
+_refresh_cache = False  # set by --refresh-cache
+
+@functools.lru_cache(maxsize=1)
+def _config() -> NodeConfig:
+    """Main node configuration, loaded once and shared by every command."""
+    return NodeConfig('main')
+
 def setup_logging():
     """Setup logging."""
     logging.basicConfig(
@@ -29,36 +67,77 @@ def setup_logging():
         format='%(asctime)s - %(levelname)s - %(message)s'
     )
 
+def _get_ydl() -> yt_dlp.YoutubeDL:
+    """Return this thread's YoutubeDL instance."""
+    ydl = getattr(_ydl_local, 'ydl', None)
+    if ydl is None:
+        ydl = _ydl_local.ydl = yt_dlp.YoutubeDL(dict(_YDL_OPTS))
+    return ydl
+
+def _load_cache() -> Dict:
+    """Load the playlist info cache from disk (once per process)."""
+    global _cache
+    if _cache is None:
+        try:
+            with open(_CACHE_FILE, 'r', encoding='utf-8') as f:
+                _cache = json.load(f)
+        except (OSError, ValueError):
+            _cache = {}
+    return _cache
+
+def _save_cache():
+    """Write the playlist info cache atomically."""
+    try:
+        _CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = _CACHE_FILE.with_suffix('.json.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(_cache, f)
+        os.replace(tmp_file, _CACHE_FILE)
+    except OSError as e:
+        logging.warning(f"Failed to write playlist cache: {e}")
+
 def get_playlist_info(playlist_url: str) -> dict:
-    """Get information about a YouTube playlist."""
+    """Get information about a YouTube playlist, served from the disk cache when fresh."""
+    playlist_info, fetched = _lookup_playlist_info(playlist_url)
+    
+    if fetched:
+        with _cache_lock:
+            _save_cache()
+    
+    return playlist_info
+
+def _lookup_playlist_info(playlist_url: str) -> Tuple[Optional[dict], bool]:
+    """Return (info, fetched); fresh lookups update the in-memory cache but don't write it."""
+    with _cache_lock:
+        entry = _load_cache().get(playlist_url)
+        if entry and not _refresh_cache and time.time() - entry['ts'] < entry['ttl']:
+            return entry['info'], False
+    
+    playlist_info = _fetch_playlist_info(playlist_url)
+    
+    with _cache_lock:
+        _load_cache()[playlist_url] = {
+            'info': playlist_info,
+            'ts': time.time(),
+            'ttl': _CACHE_TTL if playlist_info else _FAILURE_TTL
+        }
+    
+    return playlist_info, True
+
+def _fetch_playlist_info(playlist_url: str) -> dict:
+    """Fetch information about a YouTube playlist with yt-dlp."""
     try:
-        cmd = [
-            sys.executable, '-m', 'yt_dlp',
-            '--flat-playlist',
-            '--dump-json',
-            '--no-warnings',
-            '--playlist-items', '1',  # Just get first video for playlist info
-            playlist_url
-        ]
-        
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-        
-        if result.returncode != 0:
+        info = _get_ydl().extract_info(playlist_url, download=False)
+        # An empty playlist has nothing to harvest; report it as unavailable
+        if not info or not info.get('entries'):
             return None
         
-        # Parse the first video to get playlist info
-        lines = result.stdout.strip().split('\n')
-        if not lines or not lines[0]:
-            return None
-        
-        video_data = json.loads(lines[0])
-        
-        # Get playlist info from the video data
+        count = info.get('playlist_count')
         playlist_info = {
-            'title': video_data.get('playlist_title', 'Unknown'),
-            'uploader': video_data.get('playlist_uploader', 'Unknown'),
-            'video_count': video_data.get('playlist_count', 0),
-            'playlist_id': video_data.get('playlist_id', 'Unknown')
+            'title': info.get('title') or 'Unknown',
+            'uploader': info.get('uploader') or info.get('channel') or 'Unknown',
+            'video_count': count if isinstance(count, int) else 0,
+            'playlist_id': info.get('id') or 'Unknown'
         }
         
         return playlist_info
@@ -67,23 +146,41 @@ def get_playlist_info(playlist_url: str) -> dict:
         logging.error(f"Failed to get playlist info for {playlist_url}: {e}")
         return None
 
+def get_playlist_infos(playlist_urls: List[str]) -> Dict[str, Optional[dict]]:
+    """Look up several playlists concurrently; maps each URL to its info (or None)."""
+    if not playlist_urls:
+        return {}
+    
+    with ThreadPoolExecutor(max_workers=min(8, len(playlist_urls))) as executor:
+        results = list(executor.map(_lookup_playlist_info, playlist_urls))
+    
+    # One cache write for the whole batch
+    if any(fetched for _, fetched in results):
+        with _cache_lock:
+            _save_cache()
+    
+    return {url: info for url, (info, _) in zip(playlist_urls, results)}
+
 def list_playlists():
     """List all YouTube playlists currently being monitored."""
     print("\n📋 Current YouTube Playlists:")
     try:
-        config = NodeConfig('main')
+        config = _config()
         playlist_urls = config.get('playlist_urls', [])
         
         if not playlist_urls:
             print("ℹ️  No YouTube playlists configured")
             return
         
+        # Fetch every playlist's info up front
+        infos = get_playlist_infos(playlist_urls)
+        
         for i, url in enumerate(playlist_urls, 1):
             print(f"  {i}. {url}")
             
             # Try to get playlist info
             try:
-                playlist_info = get_playlist_info(url)
+                playlist_info = infos.get(url)
                 if playlist_info:
                     print(f"     📝 Title: {playlist_info.get('title', 'Unknown')}")
                     print(f"     👤 Channel: {playlist_info.get('uploader', 'Unknown')}")
@@ -106,12 +203,12 @@ def add_playlist():
         return
     
     # Validate URL format
-    if 'youtube.com/playlist' not in url:
+    if not _PLAYLIST_URL_RE.match(url):
         print("❌ Please enter a valid YouTube playlist URL")
         return
     
     try:
-        config = NodeConfig('main')
+        config = _config()
         playlist_urls = config.get('playlist_urls', [])
         
         # Check if already exists
@@ -139,11 +236,74 @@ def add_playlist():
     except Exception as e:
         print(f"❌ Failed to add playlist: {e}")
 
+def add_playlists_bulk(urls: List[str]) -> int:
+    """Add several playlists at once, saving the configuration a single time."""
+    try:
+        config = _config()
+        playlist_urls = config.get('playlist_urls', [])
+        
+        # Drop duplicates, invalid and already monitored URLs before any lookup
+        candidates = []
+        for url in dict.fromkeys(url.strip() for url in urls):
+            if not url:
+                continue
+            if not _PLAYLIST_URL_RE.match(url):
+                print(f"❌ Invalid playlist URL: {url}")
+            elif url in playlist_urls:
+                print(f"⚠️  Already monitored: {url}")
+            else:
+                candidates.append(url)
+        
+        if not candidates:
+            print("ℹ️  No new playlists to add")
+            return 0
+        
+        print(f"🔍 Testing {len(candidates)} playlist URLs...")
+        infos = get_playlist_infos(candidates)
+        
+        added = 0
+        for url in candidates:
+            playlist_info = infos.get(url)
+            if playlist_info:
+                playlist_urls.append(url)
+                added += 1
+                print(f"✅ {playlist_info.get('title', 'Unknown')} ({url})")
+            else:
+                print(f"❌ Could not access playlist: {url}")
+        
+        if added:
+            config.set('playlist_urls', playlist_urls)
+            config.save_config()
+        
+        print(f"\n📈 Added {added}/{len(candidates)} playlists")
+        return added
+        
+    except Exception as e:
+        print(f"❌ Failed to add playlists: {e}")
+        return 0
+
+def bulk_add_playlists(source: str):
+    """Add the playlist URLs listed one per line in a file ('-' for stdin)."""
+    print("\n➕ Bulk Add YouTube Playlists")
+    try:
+        if source == '-':
+            lines = sys.stdin.read().splitlines()
+        else:
+            with open(source, 'r', encoding='utf-8') as f:
+                lines = f.read().splitlines()
+    except OSError as e:
+        print(f"❌ Could not read {source}: {e}")
+        return
+    
+    # Ignore blank lines and comments
+    urls = [line for line in lines if line.strip() and not line.lstrip().startswith('#')]
+    add_playlists_bulk(urls)
+
 def remove_playlist():
     """Remove a YouTube playlist from monitoring."""
     print("\n➖ Remove YouTube Playlist")
     try:
-        config = NodeConfig('main')
+        config = _config()
         playlist_urls = config.get('playlist_urls', [])
         
         if not playlist_urls:
@@ -182,7 +342,7 @@ def test_playlist():
         print("❌ No URL provided")
         return
     
-    if 'youtube.com/playlist' not in url:
+    if not _PLAYLIST_URL_RE.match(url):
         print("❌ Please enter a valid YouTube playlist URL")
         return
     
@@ -204,7 +364,7 @@ def show_stats():
     """Show statistics for all monitored YouTube playlists."""
     print("\n📊 YouTube Playlist Statistics")
     try:
-        config = NodeConfig('main')
+        config = _config()
         playlist_urls = config.get('playlist_urls', [])
         
         if not playlist_urls:
@@ -214,10 +374,13 @@ def show_stats():
         total_videos = 0
         accessible_playlists = 0
         
+        # Fetch every playlist's info up front
+        infos = get_playlist_infos(playlist_urls)
+        
         for i, url in enumerate(playlist_urls, 1):
             print(f"\n📋 Playlist {i}: {url}")
             try:
-                playlist_info = get_playlist_info(url)
+                playlist_info = infos.get(url)
                 if playlist_info:
                     accessible_playlists += 1
                     video_count = playlist_info.get('video_count', 0)
@@ -251,17 +414,32 @@ for downloading music.
 Available commands:
   list     - Show all currently monitored playlists
   add      - Add a new playlist to monitor
+  bulk-add - Add every playlist URL listed in a file (one per line, '-' for stdin)
   remove   - Remove a playlist from monitoring
   test     - Test if a playlist URL is accessible
   stats    - Show statistics for all playlists
   help     - Show this help message
 
+Options:
+  --refresh-cache  Ignore cached playlist info and fetch it again
+
 Examples:
   python manage_playlists.py list
   python manage_playlists.py add
+  python manage_playlists.py bulk-add playlists.txt
   python manage_playlists.py test
+  python manage_playlists.py stats --refresh-cache
 """)
 
+COMMANDS = {
+    'list': list_playlists,
+    'add': add_playlist,
+    'remove': remove_playlist,
+    'test': test_playlist,
+    'stats': show_stats,
+    'help': show_help,
+}
+
 def main():
     """Main entry point."""
     setup_logging()
@@ -269,24 +447,25 @@ def main():
     if len(sys.argv) < 2:
         print("🎧 Project 5001 - YouTube Playlist Manager")
         print("=" * 50)
-        print("Available commands: list, add, remove, test, stats, help")
+        print("Available commands: list, add, bulk-add, remove, test, stats, help")
         print("Use 'python manage_playlists.py help' for more information")
         return
     
     command = sys.argv[1].lower()
     
-    if command == 'list':
-        list_playlists()
-    elif command == 'add':
-        add_playlist()
-    elif command == 'remove':
-        remove_playlist()
-    elif command == 'test':
-        test_playlist()
-    elif command == 'stats':
-        show_stats()
-    elif command == 'help':
-        show_help()
+    global _refresh_cache
+    _refresh_cache = '--refresh-cache' in sys.argv[2:]
+    
+    if command == 'bulk-add':
+        if len(sys.argv) < 3 or sys.argv[2].startswith('--'):
+            print("❌ Usage: python manage_playlists.py bulk-add <file|->")
+            return
+        bulk_add_playlists(sys.argv[2])
+        return
+    
+    handler = COMMANDS.get(command)
+    if handler:
+        handler()
     else:
         print(f"❌ Unknown command: {command}")
         print("Use 'python manage_playlists.py help' for available commands")
@@ -5,23 +5,131 @@ Manages intelligent device rotation based on YouTube rate limiting detection.
 """
 
 import time
+import queue
+import atexit
 import logging
-import requests
-import subprocess
-from datetime import datetime, timedelta
+import threading
+from datetime import datetime, timezone
 from typing import Dict, List, Optional, Tuple
 from config import NodeConfig
 from database import Project5001Database
-import sqlite3
+import re
+
+# Error message patterns for each rate limit event type, most specific first
+_RATE_LIMIT_PRIORITY = [
+    'http_429', 'http_403', 'http_503', 'quota_exceeded', 'connection_timeout', 'download_failure'
+]
+_RATE_LIMIT_RE = re.compile(
+    r'(?P<http_429>429|too many requests)'
+    r'|(?P<http_403>403|forbidden)'
+    r'|(?P<http_503>503|service unavailable)'
+    r'|(?P<quota_exceeded>quota)'
+    r'|(?P<connection_timeout>timeout|connection)'
+    r'|(?P<download_failure>failed)',
+    re.IGNORECASE
+)
+
+# Only the head of an error is scanned; yt-dlp tracebacks can run to hundreds of KB
+_ERROR_SCAN_LIMIT = 4096
+
+# HTTP status codes that map directly to an event type
+_STATUS_MAP = {429: 'http_429', 403: 'http_403', 503: 'http_503'}
+
+class AdaptiveConcurrency:
+    """AIMD limit on concurrent downloads: starts at the cap, halved on throttling, +1 after a run of successes."""
+    
+    def __init__(self, cap: int, increase_after: int = 10):
+        self.cap = max(1, cap)
+        self.limit = self.cap
+        self.increase_after = increase_after
+        self._active = 0
+        self._streak = 0
+        self._cond = threading.Condition()
+    
+    def set_cap(self, cap: int):
+        """Change the upper bound; an unthrottled limit follows it, a backed-off one is clamped to it."""
+        with self._cond:
+            backed_off = self.limit < self.cap
+            self.cap = max(1, cap)
+            self.limit = min(self.limit, self.cap) if backed_off else self.cap
+            self._cond.notify_all()
+    
+    def __enter__(self):
+        with self._cond:
+            while self._active >= self.limit:
+                self._cond.wait()
+            self._active += 1
+        return self
+    
+    def __exit__(self, *exc):
+        with self._cond:
+            self._active -= 1
+            self._cond.notify()
+    
+    def record(self, success: bool, throttled: bool = False):
+        """Adjust the limit after a download attempt."""
+        with self._cond:
+            if throttled:
+                self._streak = 0
+                new_limit = max(1, self.limit // 2)
+                if new_limit != self.limit:
+                    logging.info(f"Throttled, lowering download concurrency to {new_limit}")
+                self.limit = new_limit
+            elif success:
+                self._streak += 1
+                if self._streak >= self.increase_after and self.limit < self.cap:
+                    self._streak = 0
+                    self.limit += 1
+                    logging.info(f"Raising download concurrency to {self.limit}")
+                    self._cond.notify()
+
+class TokenBucket:
+    """Token bucket on the monotonic clock; acquire() blocks until a token is free."""
+    
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = 1.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self):
+        """Take one token, sleeping until the bucket has refilled enough."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
 
 class RateLimitDetector:
     """Detects rate limiting from YouTube and manages device rotation."""
     
+    __slots__ = ('config', 'db', 'current_device_id', 'rate_limit_patterns', 'cooldown_periods',
+                 '_cooldown_secs', '_devices_cache', '_cache_ts', '_cache_ttl',
+                 '_event_queue', '_event_writer', '_event_writer_lock')
+    
     def __init__(self, config: NodeConfig, database: Project5001Database):
         self.config = config
         self.db = database
         self.current_device_id = config.get('syncthing.device_id')
         
+        # Device rows change on the order of minutes; cache them briefly and drop the
+        # cache whenever this detector writes device state
+        self._devices_cache = None
+        self._cache_ts = 0.0
+        self._cache_ttl = 5.0
+        
+        # Event log rows are written in batches by a background thread; the
+        # device cooldown itself is still updated synchronously
+        self._event_queue = queue.SimpleQueue()
+        self._event_writer = None
+        self._event_writer_lock = threading.Lock()
+        
         # Rate limiting patterns to detect
         self.rate_limit_patterns = {
             'http_429': 'HTTP 429 Too Many Requests',
@@ -43,35 +151,23 @@ class RateLimitDetector:
             'connection_timeout': 5,  # 5 minutes for timeouts
             'quota_exceeded': 120  # 2 hours for quota issues
         }
+        self._cooldown_secs = {k: v * 60 for k, v in self.cooldown_periods.items()}
     
     def detect_rate_limit(self, error_output: str, http_status: int = None, 
                          download_speed: float = None) -> Optional[str]:
         """Detect rate limiting from various signals."""
         
         # Check HTTP status codes
-        if http_status:
-            if http_status == 429:
-                return 'http_429'
-            elif http_status == 403:
-                return 'http_403'
-            elif http_status == 503:
-                return 'http_503'
+        event_type = _STATUS_MAP.get(http_status)
+        if event_type:
+            return event_type
         
-        # Check error output for patterns
-        error_lower = error_output.lower()
-        
-        if '429' in error_output or 'too many requests' in error_lower:
-            return 'http_429'
-        elif '403' in error_output or 'forbidden' in error_lower:
-            return 'http_403'
-        elif '503' in error_output or 'service unavailable' in error_lower:
-            return 'http_503'
-        elif 'quota exceeded' in error_lower or 'quota' in error_lower:
-            return 'quota_exceeded'
-        elif 'timeout' in error_lower or 'connection' in error_lower:
-            return 'connection_timeout'
-        elif 'download failed' in error_lower or 'failed' in error_lower:
-            return 'download_failure'
+        # Check error output for patterns in one pass; when several match,
+        # the most specific event type wins
+        error_output = error_output[:_ERROR_SCAN_LIMIT] if error_output else ''
+        matched = {match.lastgroup for match in _RATE_LIMIT_RE.finditer(error_output)}
+        if matched:
+            return min(matched, key=_RATE_LIMIT_PRIORITY.index)
         
         # Check for speed drops (if we have speed data)
         if download_speed and download_speed < 10000:  # Less than 10KB/s
@@ -79,51 +175,114 @@ class RateLimitDetector:
         
         return None
     
+    def _get_devices_cached(self) -> List[Dict]:
+        """Return the available devices, re-reading them at most every _cache_ttl seconds."""
+        if self._devices_cache is None or time.monotonic() - self._cache_ts >= self._cache_ttl:
+            self._devices_cache = self.db.get_available_devices()
+            self._cache_ts = time.monotonic()
+        return self._devices_cache
+    
+    def _invalidate_devices(self):
+        """Force the next device lookup to hit the database."""
+        self._devices_cache = None
+    
     def record_rate_limit_event(self, device_id: str, event_type: str, 
                                details: str = None) -> bool:
         """Record a rate limiting event in the database."""
-        return self.db.record_rate_limit(device_id, event_type, details)
+        # The cooldown must be in place before the next rotation decision
+        recorded = self.db.record_rate_limit(
+            device_id, event_type, details, log_event=False,
+            cooldown_until=int(time.time()) + self._cooldown_secs.get(event_type, 300)
+        )
+        self._invalidate_devices()
+        
+        # Same format as SQLite's CURRENT_TIMESTAMP default
+        event_date = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        self._event_queue.put((device_id, event_date, event_type, details))
+        self._start_event_writer()
+        return recorded
+    
+    def _start_event_writer(self):
+        """Start the background event writer on first use."""
+        with self._event_writer_lock:
+            if self._event_writer is None:
+                self._event_writer = threading.Thread(
+                    target=self._write_events, name='rate-limit-events', daemon=True
+                )
+                self._event_writer.start()
+                atexit.register(self.flush_events)
+    
+    def _drain_events(self, first=None, limit: int = 64) -> List:
+        """Take up to limit queued events without blocking."""
+        events = [first] if first else []
+        while len(events) < limit:
+            try:
+                events.append(self._event_queue.get_nowait())
+            except queue.Empty:
+                break
+        return events
+    
+    def _write_events(self):
+        """Background loop writing queued events, one transaction per batch."""
+        while True:
+            first = self._event_queue.get()
+            # Give a burst of failures a moment to accumulate into one batch
+            time.sleep(0.1)
+            self.db.add_rate_limit_events(self._drain_events(first))
     
-    def is_device_in_cooldown(self, device_id: str) -> bool:
-        """Check if a device is currently in cooldown."""
-        devices = self.db.get_available_devices()
+    def flush_events(self):
+        """Write any queued events now."""
+        while True:
+            events = self._drain_events()
+            if not events:
+                break
+            self.db.add_rate_limit_events(events)
+    
+    def _device_in_cooldown(self, device: Dict, now: float) -> bool:
+        """Check a device row's cooldown (epoch seconds) against a fixed point in time."""
+        cooldown_until = device['cooldown_until']
+        return bool(cooldown_until) and cooldown_until > now
+    
+    def is_device_in_cooldown(self, device_id: str, devices: List[Dict] = None) -> bool:
+        """Check if a device is currently in cooldown.
+        
+        Pass devices (rows from get_available_devices) to avoid re-reading them.
+        """
+        if devices is None:
+            devices = self._get_devices_cached()
         
         for device in devices:
             if device['device_id'] == device_id:
-                if device['cooldown_until']:
-                    cooldown_until = datetime.fromisoformat(device['cooldown_until'])
-                    if datetime.now() < cooldown_until:
-                        logging.info(f"Device {device_id} is in cooldown until {cooldown_until}")
-                        return True
+                if self._device_in_cooldown(device, time.time()):
+                    cooldown_until = datetime.fromtimestamp(device['cooldown_until'])
+                    logging.info(f"Device {device_id} is in cooldown until {cooldown_until}")
+                    return True
                 break
         
         return False
     
     def get_next_available_device(self) -> Optional[Dict]:
         """Get the next available device for downloading."""
-        devices = self.db.get_available_devices()
+        devices = self._get_devices_cached()
         
         if not devices:
             logging.warning("No devices available for rotation")
             return None
         
-        # Filter out devices in cooldown
-        available_devices = []
-        for device in devices:
-            if not self.is_device_in_cooldown(device['device_id']):
-                available_devices.append(device)
+        # Filter out devices in cooldown, all judged against the same moment
+        now = time.time()
+        available_devices = [device for device in devices
+                             if not self._device_in_cooldown(device, now)]
         
         if not available_devices:
             logging.warning("All devices are in cooldown")
             return None
         
-        # Sort by last used (oldest first) and rate limit count (lowest first)
-        available_devices.sort(key=lambda x: (
-            x['last_used'] or '1970-01-01',
+        # Least recently used first, then lowest rate limit count
+        next_device = min(available_devices, key=lambda x: (
+            x['last_used'] or 0,
             x['rate_limit_count']
         ))
-        
-        next_device = available_devices[0]
         logging.info(f"Selected device for rotation: {next_device['device_name']}")
         return next_device
     
@@ -134,6 +293,7 @@ class RateLimitDetector:
         if next_device:
             # Update current device as used
             self.db.update_device_usage(next_device['device_id'], success=True)
+            self._invalidate_devices()
             self.current_device_id = next_device['device_id']
             
             logging.info(f"Rotated to device: {next_device['device_name']}")
@@ -147,7 +307,11 @@ class RateLimitDetector:
         
         # Detect rate limiting
         rate_limit_type = self.detect_rate_limit(error_output, http_status, download_speed)
-        
+        return self.handle_detected_failure(rate_limit_type, error_output, http_status)
+    
+    def handle_detected_failure(self, rate_limit_type: Optional[str], error_output: str,
+                                http_status: int = None) -> bool:
+        """Handle a download failure whose rate limit type (or None) is already known."""
         if rate_limit_type:
             logging.warning(f"Rate limiting detected: {rate_limit_type}")
             
@@ -174,11 +338,12 @@ class RateLimitDetector:
             # Not a rate limit, just a regular failure
             logging.info("Download failure (not rate limiting)")
             self.db.update_device_usage(self.current_device_id, success=False)
+            self._invalidate_devices()
             return False
     
     def get_rotation_status(self) -> Dict:
         """Get current rotation status."""
-        devices = self.db.get_available_devices()
+        devices = self._get_devices_cached()
         
         status = {
             'current_device': self.current_device_id,
@@ -188,8 +353,9 @@ class RateLimitDetector:
             'device_details': []
         }
         
+        now = time.time()
         for device in devices:
-            in_cooldown = self.is_device_in_cooldown(device['device_id'])
+            in_cooldown = self._device_in_cooldown(device, now)
             if not in_cooldown:
                 status['available_devices'] += 1
             else:
@@ -211,82 +377,78 @@ class RateLimitDetector:
 class DeviceManager:
     """Manages device registration and health monitoring."""
     
+    __slots__ = ('config', 'db', '_health_cache', '_health_ts', '_health_ttl')
+    
     def __init__(self, config: NodeConfig, database: Project5001Database):
         self.config = config
         self.db = database
+        
+        # Short-lived cache of per-device health, shared by dashboard polls
+        self._health_cache: Optional[Dict[str, Dict]] = None
+        self._health_ts = 0.0
+        self._health_ttl = 5.0
     
     def register_device(self, device_id: str, device_name: str, device_type: str) -> bool:
         """Register a new device in the rotation pool."""
+        self._health_cache = None
         return self.db.add_device(device_id, device_name, device_type)
     
-    def get_device_health(self, device_id: str) -> Dict:
-        """Get health statistics for a device."""
-        devices = self.db.get_available_devices()
+    def get_all_health(self) -> Dict[str, Dict]:
+        """Get health statistics for every device, re-reading them at most every _health_ttl seconds."""
+        if self._health_cache is not None and time.monotonic() - self._health_ts < self._health_ttl:
+            return self._health_cache
         
-        for device in devices:
-            if device['device_id'] == device_id:
-                success_rate = 0
-                if device['success_count'] + device['failure_count'] > 0:
-                    success_rate = device['success_count'] / (device['success_count'] + device['failure_count'])
-                
-                return {
-                    'device_id': device['device_id'],
-                    'device_name': device['device_name'],
-                    'device_type': device['device_type'],
-                    'is_active': device['is_active'],
-                    'success_count': device['success_count'],
-                    'failure_count': device['failure_count'],
-                    'success_rate': round(success_rate * 100, 2),
-                    'rate_limit_count': device['rate_limit_count'],
-                    'last_used': device['last_used'],
-                    'last_rate_limit': device['last_rate_limit']
-                }
+        health = {}
+        for device in self.db.get_available_devices():
+            attempts = device['success_count'] + device['failure_count']
+            success_rate = device['success_count'] / attempts if attempts else 0.0
+            health[device['device_id']] = {
+                'device_id': device['device_id'],
+                'device_name': device['device_name'],
+                'device_type': device['device_type'],
+                'is_active': device['is_active'],
+                'success_count': device['success_count'],
+                'failure_count': device['failure_count'],
+                'success_rate': round(success_rate * 100, 2),
+                'rate_limit_count': device['rate_limit_count'],
+                'last_used': device['last_used'],
+                'last_rate_limit': device['last_rate_limit']
+            }
         
-        return {}
+        self._health_cache = health
+        self._health_ts = time.monotonic()
+        return health
+    
+    def get_device_health(self, device_id: str) -> Dict:
+        """Get health statistics for a device."""
+        return self.get_all_health().get(device_id, {})
     
     def deactivate_device(self, device_id: str) -> bool:
         """Deactivate a device from rotation."""
-        try:
-            conn = sqlite3.connect(self.db.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                UPDATE device_rotation 
-                SET is_active = 0
-                WHERE device_id = ?
-            ''', (device_id,))
-            
-            conn.commit()
-            conn.close()
-            
-            logging.info(f"Deactivated device: {device_id}")
-            return True
-            
-        except Exception as e:
-            logging.error(f"Failed to deactivate device {device_id}: {e}")
+        self._health_cache = None
+        if not self.db.set_devices_active([device_id], False):
+            return False
+        
+        logging.info(f"Deactivated device: {device_id}")
+        return True
+    
+    def bulk_deactivate(self, device_ids: List[str]) -> bool:
+        """Deactivate several devices with one database transaction."""
+        self._health_cache = None
+        if not self.db.set_devices_active(device_ids, False):
             return False
+        
+        logging.info(f"Deactivated {len(device_ids)} devices")
+        return True
     
     def reactivate_device(self, device_id: str) -> bool:
         """Reactivate a device in rotation."""
-        try:
-            conn = sqlite3.connect(self.db.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                UPDATE device_rotation 
-                SET is_active = 1, cooldown_until = NULL
-                WHERE device_id = ?
-            ''', (device_id,))
-            
-            conn.commit()
-            conn.close()
-            
-            logging.info(f"Reactivated device: {device_id}")
-            return True
-            
-        except Exception as e:
-            logging.error(f"Failed to reactivate device {device_id}: {e}")
+        self._health_cache = None
+        if not self.db.set_devices_active([device_id], True):
             return False
+        
+        logging.info(f"Reactivated device: {device_id}")
+        return True
 
 if __name__ == '__main__':
     # Test rate limiting detection
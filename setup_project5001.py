@@ -12,6 +12,8 @@ import getpass
 from pathlib import Path
 from typing import Dict, List
 import shutil
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
 
 def print_banner():
     """Print Project 5001 banner."""
@@ -21,9 +23,13 @@ def print_banner():
     print("="*50 + "🎧")
     print()
 
+def _which_ffmpeg() -> str:
+    """Locate ffmpeg on PATH."""
+    return shutil.which('ffmpeg') or ''
+
 def check_ffmpeg() -> str:
     """Ensure ffmpeg is available in system PATH."""
-    ffmpeg_path = shutil.which('ffmpeg')
+    ffmpeg_path = _which_ffmpeg()
     if ffmpeg_path:
         print(f"✅ ffmpeg found: {ffmpeg_path}")
         return ffmpeg_path
@@ -54,9 +60,30 @@ def check_ffmpeg() -> str:
         print("   - macOS: Use Homebrew (brew install ffmpeg)")
         return ''
 
+# Import names of required packages whose pip name differs
+_IMPORT_NAMES = {'python-dotenv': 'dotenv'}
+
+def _check_ytdlp() -> str:
+    """Return the installed yt-dlp version, or '' if it is not available."""
+    try:
+        result = subprocess.run(['yt-dlp', '--version'], 
+                              capture_output=True, text=True, check=True)
+        return result.stdout.strip()
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return ''
+
+def _check_package(package: str) -> bool:
+    """Check that a package is importable without importing it."""
+    return importlib.util.find_spec(_IMPORT_NAMES.get(package, package.replace('-', '_'))) is not None
+
+def _write_lines(lines: List[str]):
+    """Write a batch of status lines to stdout at once."""
+    sys.stdout.write('\n'.join(lines) + '\n')
+    sys.stdout.flush()
+
 def check_dependencies() -> bool:
     """Check if required dependencies are installed."""
-    print("🔍 Checking dependencies...")
+    print("🔍 Checking dependencies...", flush=True)
     
     # Check Python version
     if sys.version_info < (3, 8):
@@ -64,27 +91,37 @@ def check_dependencies() -> bool:
         return False
     print(f"✅ Python {sys.version_info.major}.{sys.version_info.minor}")
     
+    required_packages = ['requests', 'python-dotenv']
+    
+    # The probes are independent, so run them together and report in order
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        ytdlp_future = executor.submit(_check_ytdlp)
+        ffmpeg_future = executor.submit(_which_ffmpeg)
+        package_results = list(executor.map(_check_package, required_packages))
+        ytdlp_version = ytdlp_future.result()
+        ffmpeg_found = ffmpeg_future.result()
+    
+    # Report the probe results in one write rather than a print per line
+    msgs = []
+    
     # Check yt-dlp
-    try:
-        result = subprocess.run(['yt-dlp', '--version'], 
-                              capture_output=True, text=True, check=True)
-        print(f"✅ yt-dlp {result.stdout.strip()}")
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        print("❌ yt-dlp not found")
-        print("   Install with: pip install yt-dlp")
+    if ytdlp_version:
+        msgs.append(f"✅ yt-dlp {ytdlp_version}")
+    else:
+        msgs.append("❌ yt-dlp not found")
+        msgs.append("   Install with: pip install yt-dlp")
+        _write_lines(msgs)
         return False
     
     # Check Python packages
-    required_packages = ['requests', 'mutagen', 'python-dotenv']
     missing_packages = []
-    
-    for package in required_packages:
-        try:
-            __import__(package.replace('-', '_'))
-            print(f"✅ {package}")
-        except ImportError:
+    for package, installed in zip(required_packages, package_results):
+        if installed:
+            msgs.append(f"✅ {package}")
+        else:
             missing_packages.append(package)
-            print(f"❌ {package}")
+            msgs.append(f"❌ {package}")
+    _write_lines(msgs)
     
     if missing_packages:
         print(f"\n📦 Installing missing packages: {', '.join(missing_packages)}")
@@ -95,9 +132,10 @@ def check_dependencies() -> bool:
             print("❌ Failed to install packages")
             return False
     
-    # Check ffmpeg
-    ffmpeg_path = check_ffmpeg()
-    if not ffmpeg_path:
+    # Check ffmpeg (installing it if the probe found nothing)
+    if ffmpeg_found:
+        print(f"✅ ffmpeg found: {ffmpeg_found}")
+    elif not check_ffmpeg():
         print("❌ ffmpeg is required. Please install it and re-run setup.")
         return False
     
@@ -310,13 +348,8 @@ def test_configuration(role: str) -> bool:
         print(f"❌ Configuration test failed: {e}")
         return False
 
-def create_startup_scripts(role: str):
-    """Create startup scripts for the node."""
-    print(f"\n📜 Creating startup scripts for {role} node...")
-    
-    # Create main startup script
-    if role == 'main':
-        script_content = '''#!/usr/bin/env python3
+# Startup script written for main nodes
+_MAIN_STARTUP_SCRIPT = '''#!/usr/bin/env python3
 # Project 5001 - Main Node Startup Script
 import sys
 import os
@@ -327,27 +360,20 @@ from harvester_v2 import main
 if __name__ == '__main__':
     main()
 '''
-        
-        with open('start_main_node.py', 'w') as f:
-            f.write(script_content)
-        
-        # Make executable
-        os.chmod('start_main_node.py', 0o755)
-        print("✅ Created start_main_node.py")
-    
-    # Create systemd service file
-    service_content = f'''[Unit]
-Description=Project 5001 {role.title()} Node
+
+# systemd unit, filled in with str.format_map
+_SERVICE_TEMPLATE = '''[Unit]
+Description=Project 5001 {role_title} Node
 After=network.target
 Wants=network.target
 
 [Service]
 Type=simple
-User={getpass.getuser()}
-Group={getpass.getuser()}
-WorkingDirectory={os.getcwd()}
-Environment=PATH={os.environ.get('PATH', '/usr/local/bin:/usr/bin:/bin')}
-ExecStart={sys.executable} harvester_v2.py {role} --daemon
+User={user}
+Group={user}
+WorkingDirectory={cwd}
+Environment=PATH={path}
+ExecStart={py} harvester_v2.py {role} --daemon
 Restart=always
 RestartSec=10
 StandardOutput=journal
@@ -356,9 +382,29 @@ StandardError=journal
 [Install]
 WantedBy=multi-user.target
 '''
+
+def create_startup_scripts(role: str):
+    """Create startup scripts for the node."""
+    print(f"\n📜 Creating startup scripts for {role} node...")
     
-    with open(f'project5001-{role}-node.service', 'w') as f:
-        f.write(service_content)
+    # Create main startup script
+    if role == 'main':
+        Path('start_main_node.py').write_text(_MAIN_STARTUP_SCRIPT)
+        
+        # Make executable
+        os.chmod('start_main_node.py', 0o755)
+        print("✅ Created start_main_node.py")
+    
+    # Create systemd service file
+    ctx = {
+        'user': getpass.getuser(),
+        'cwd': os.getcwd(),
+        'path': os.environ.get('PATH', '/usr/local/bin:/usr/bin:/bin'),
+        'py': sys.executable,
+        'role': role,
+        'role_title': role.title(),
+    }
+    Path(f'project5001-{role}-node.service').write_text(_SERVICE_TEMPLATE.format_map(ctx))
     
     print(f"✅ Created project5001-{role}-node.service")
 
@@ -5,34 +5,223 @@ Monitor the health and statistics of your music archive.
 """
 
 import os
+import time
 import sqlite3
 import json
+import threading
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, List
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 from dotenv import load_dotenv
 
+try:
+    import orjson  # Optional: faster --json output
+except ImportError:
+    orjson = None
+
 # Load environment variables
 load_dotenv()
 
+# Computed stats reused across runs while their fingerprint is unchanged
+_STATUS_CACHE = Path('./Project5001/Cache/status.json')
+
+# A Harvest directory with more subdirectories than this is treated as
+# partitioned, and its subdirectories are scanned in parallel
+_SHARD_THRESHOLD = 4
+
+# Size distribution buckets for get_file_stats: upper bounds and labels
+_SIZE_THRESHOLDS = (5 << 20, 10 << 20, 15 << 20)
+_SIZE_LABELS = ("0-5MB", "5-10MB", "10-15MB", "15MB+")
+
+# Keep-alive session for Syncthing API checks, shared by every status checker
+# and created on first use
+_SESSION = None
+
+def _syncthing_session(api_key: str):
+    """Return the shared Syncthing session, authenticated with api_key."""
+    global _SESSION
+    if _SESSION is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+        
+        # One local API endpoint, so a single warm connection is enough
+        _SESSION = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1)
+        _SESSION.mount('http://', adapter)
+        _SESSION.mount('https://', adapter)
+    if _SESSION.headers.get('X-API-Key') != api_key:
+        _SESSION.headers['X-API-Key'] = api_key
+    return _SESSION
+
+# Below this many items a thread pool costs more than it saves
+_POOL_THRESHOLD = 8
+
+def _map_io(func: Callable, items: list) -> list:
+    """Map an I/O-bound func over items, on a thread pool when there are enough of them."""
+    if len(items) < _POOL_THRESHOLD:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4)) as executor:
+        return list(executor.map(func, items))
+
+# A line starting with any of these whitespace bytes may be blank
+_WHITESPACE_LED = (b'\n ', b'\n\t', b'\n\x0b', b'\n\x0c')
+
+def _count_playlist_tracks(path: str) -> int:
+    """Count the non-comment lines (actual tracks) of a playlist.
+    
+    Works on raw bytes with C-level counts: every line, minus empty lines,
+    minus lines starting with '#'. That only holds for \n or \r\n line endings
+    and lines that don't start with whitespace (which may be blank); anything
+    else is rare, and only then is each line inspected.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    lines = data.splitlines()
+    if (data.count(b'\r') != data.count(b'\r\n') or data[:1].isspace()
+            or any(prefix in data for prefix in _WHITESPACE_LED)):
+        return sum(1 for line in lines if line.strip() and not line.startswith(b'#'))
+    comments = data.count(b'\n#') + data.startswith(b'#')
+    return len(lines) - lines.count(b'') - comments
+
+def _log_info(log_file: os.DirEntry) -> Dict:
+    """Size and modification time of a log file."""
+    try:
+        stat = log_file.stat()
+        return {
+            "name": log_file.name,
+            "size_mb": round(stat.st_size / (1024 * 1024), 2),
+            "modified": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(stat.st_mtime))
+        }
+    except Exception as e:
+        return {
+            "name": log_file.name,
+            "error": str(e)
+        }
+
+def _iter_files(root: Path, suffix: str) -> Iterator[os.DirEntry]:
+    """Yield the regular files directly under root whose name ends with suffix."""
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if entry.name.endswith(suffix) and entry.is_file(follow_symlinks=False):
+                yield entry
+
+def _walk_files(root: Path, suffix: str) -> Iterator[os.DirEntry]:
+    """Yield the files under root, recursively, whose name ends with suffix."""
+    stack = [str(root)]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.name.endswith(suffix):
+                    yield entry
+
+def _size_histogram(entries: Iterable[os.DirEntry]) -> Tuple[int, int, List[int]]:
+    """Total size, file count and size-bucket counts for a batch of files."""
+    total_size = 0
+    total_files = 0
+    buckets = [0] * len(_SIZE_LABELS)
+    for entry in entries:
+        size = entry.stat().st_size
+        total_size += size
+        total_files += 1
+        buckets[bisect_right(_SIZE_THRESHOLDS, size)] += 1
+    return total_size, total_files, buckets
+
 class Project5001Status:
     def __init__(self):
         self.db_path = Path('./Project5001/harvest.db')
         self.dest_dir = Path(os.getenv('DEST_DIR', './Project5001/Harvest'))
         self.playlists_dir = Path('./Project5001/Playlists')
         self.logs_dir = Path('./Project5001/Logs')
+        
+        # Fingerprinted stats from previous runs, loaded on first use; the
+        # subsections are collected concurrently, so access is locked
+        self._cache = None
+        self._cache_lock = threading.RLock()
+        
+        # Database connection, opened and tuned on first use
+        self._conn = None
+    
+    def _load_cache(self) -> Dict:
+        """Load the status cache from disk (once per instance)."""
+        with self._cache_lock:
+            if self._cache is None:
+                try:
+                    with open(_STATUS_CACHE, 'r', encoding='utf-8') as f:
+                        self._cache = json.load(f)
+                except (OSError, ValueError):
+                    self._cache = {}
+            return self._cache
+    
+    def _cached(self, section: str, fingerprint: list):
+        """Return the cached value for a section if its fingerprint still matches."""
+        entry = self._load_cache().get(section)
+        if entry and entry['fingerprint'] == fingerprint:
+            return entry['value']
+        return None
+    
+    def _store(self, section: str, fingerprint: list, value):
+        """Remember a section's value and write the cache atomically."""
+        self._set_section(section, {'fingerprint': fingerprint, 'value': value})
+    
+    def _set_section(self, section: str, data):
+        """Replace a cache section and write the cache atomically."""
+        with self._cache_lock:
+            self._load_cache()[section] = data
+            self._save_cache()
+    
+    def _save_cache(self):
+        """Write the status cache atomically (caller holds _cache_lock)."""
+        try:
+            _STATUS_CACHE.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = _STATUS_CACHE.with_suffix('.json.tmp')
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(self._cache, f)
+            os.replace(tmp_file, _STATUS_CACHE)
+        except OSError:
+            # A read-only tree just means no caching
+            pass
+    
+    def _connection(self) -> sqlite3.Connection:
+        """Return the shared database connection, opening and tuning it once."""
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+            pragmas = [
+                'PRAGMA journal_mode=WAL',
+                'PRAGMA synchronous=NORMAL',
+                'PRAGMA temp_store=MEMORY',
+                'PRAGMA mmap_size=268435456',  # 256 MiB memory-mapped I/O
+                'PRAGMA cache_size=-65536'  # 64 MiB page cache
+            ]
+            for pragma in pragmas:
+                try:
+                    self._conn.execute(pragma)
+                except sqlite3.OperationalError:
+                    # e.g. a read-only database cannot switch journal mode
+                    pass
+        return self._conn
+    
+    def close(self):
+        """Close the database connection."""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
     
-    def get_database_stats(self) -> Dict:
-        """Get database statistics."""
+    def get_database_stats(self, health: Optional[List[str]] = None, health_only: bool = False) -> Dict:
+        """Get database statistics.
+        
+        Issues are appended to health as they are found; with health_only the
+        top-artists aggregate is skipped.
+        """
         if not self.db_path.exists():
+            if health is not None:
+                health.append("Database not found")
             return {"error": "Database not found"}
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Total tracks
-        cursor.execute('SELECT COUNT(*) FROM videos')
-        total_tracks = cursor.fetchone()[0]
+        cursor = self._connection().cursor()
         
         # Add compatibility layer for ts column name (legacy support)
         # Check for both column names to handle different database versions
@@ -42,26 +231,34 @@ class Project5001Status:
         # Use appropriate column name based on what exists
         date_column = 'ts' if 'ts' in columns else 'download_date'
         
-        # Recent tracks (last 7 days)
+        # Total, recent (last 7 days), oldest and newest tracks in one scan
         week_ago = (datetime.now() - timedelta(days=7)).isoformat()
-        cursor.execute(f'SELECT COUNT(*) FROM videos WHERE {date_column} >= ?', (week_ago,))
-        recent_tracks = cursor.fetchone()[0]
+        cursor.execute(f'''
+            SELECT COUNT(*), COALESCE(SUM({date_column} >= ?), 0),
+                   MIN({date_column}), MAX({date_column})
+            FROM videos
+        ''', (week_ago,))
+        total_tracks, recent_tracks, oldest, newest = cursor.fetchone()
         
-        # Top artists
-        cursor.execute('''
-            SELECT artist, COUNT(*) as count 
-            FROM videos 
-            GROUP BY artist 
-            ORDER BY count DESC 
-            LIMIT 10
-        ''')
-        top_artists = cursor.fetchall()
+        if health is not None and total_tracks == 0:
+            health.append("No tracks harvested")
+        if health_only:
+            return {"total_tracks": total_tracks}
         
-        # Oldest and newest tracks
-        cursor.execute(f'SELECT MIN({date_column}), MAX({date_column}) FROM videos')
-        oldest, newest = cursor.fetchone()
-        
-        conn.close()
+        # Top artists; the archive is append-mostly, so the grouping is only
+        # redone when the track count or newest track changes
+        fingerprint = [total_tracks, newest]
+        top_artists = self._cached('top_artists', fingerprint)
+        if top_artists is None:
+            cursor.execute('''
+                SELECT artist, COUNT(*) as count 
+                FROM videos 
+                GROUP BY artist 
+                ORDER BY count DESC 
+                LIMIT 10
+            ''')
+            top_artists = [list(row) for row in cursor.fetchall()]
+            self._store('top_artists', fingerprint, top_artists)
         
         return {
             "total_tracks": total_tracks,
@@ -71,65 +268,126 @@ class Project5001Status:
             "newest_track": newest
         }
     
-    def get_file_stats(self) -> Dict:
-        """Get file system statistics."""
+    def get_file_stats(self, health: Optional[List[str]] = None, health_only: bool = False) -> Dict:
+        """Get file system statistics.
+        
+        Issues are appended to health as they are found; with health_only the
+        scan stops at the first audio file.
+        """
         if not self.dest_dir.exists():
+            if health is not None:
+                health.append("Harvest directory not found")
             return {"error": "Harvest directory not found"}
         
-        # Count audio files
-        audio_files = list(self.dest_dir.glob('*.mp3'))
-        total_size = sum(f.stat().st_size for f in audio_files)
+        if health_only:
+            has_files = self._has_audio_files()
+            if health is not None and not has_files:
+                health.append("No audio files found")
+            return {"has_files": has_files}
         
-        # Get file size distribution
-        size_ranges = {
-            "0-5MB": 0,
-            "5-10MB": 0,
-            "10-15MB": 0,
-            "15MB+": 0
-        }
+        # Files are only added, renamed or removed, all of which bump the
+        # mtime of the directory holding them, so unchanged mtimes for the
+        # Harvest directory and its shard subdirectories mean unchanged stats
+        shards = self._load_cache().get('files', {}).get('shards', [])
+        stats = self._cached('files', self._files_fingerprint(shards))
+        if stats is None:
+            stats, shards = self._scan_audio_files()
+            self._set_section('files', {
+                'fingerprint': self._files_fingerprint(shards),
+                'value': stats,
+                'shards': shards
+            })
         
-        for file in audio_files:
-            size_mb = file.stat().st_size / (1024 * 1024)
-            if size_mb < 5:
-                size_ranges["0-5MB"] += 1
-            elif size_mb < 10:
-                size_ranges["5-10MB"] += 1
-            elif size_mb < 15:
-                size_ranges["10-15MB"] += 1
-            else:
-                size_ranges["15MB+"] += 1
+        if health is not None and stats['total_files'] == 0:
+            health.append("No audio files found")
+        return stats
+    
+    def _files_fingerprint(self, shards: List[str]) -> list:
+        """mtimes of the Harvest directory and of each shard subdirectory."""
+        fingerprint = [self.dest_dir.stat().st_mtime_ns]
+        for shard in shards:
+            try:
+                fingerprint.append(os.stat(shard).st_mtime_ns)
+            except OSError:
+                fingerprint.append(None)
+        return fingerprint
+    
+    def _scan_audio_files(self) -> Tuple[Dict, List[str]]:
+        """Count audio files and bucket their sizes; returns the stats and the shards scanned."""
+        with os.scandir(self.dest_dir) as entries:
+            top_level = list(entries)
         
-        return {
-            "total_files": len(audio_files),
+        # Top-level files always count; a partitioned archive also has its
+        # subdirectories scanned, one task each
+        subdirs = sorted(entry.path for entry in top_level if entry.is_dir(follow_symlinks=False))
+        shards = subdirs if len(subdirs) > _SHARD_THRESHOLD else []
+        
+        parts = [_size_histogram(entry for entry in top_level
+                                 if entry.name.endswith('.mp3') and entry.is_file(follow_symlinks=False))]
+        if shards:
+            with ThreadPoolExecutor(max_workers=min(32, len(shards))) as executor:
+                parts += executor.map(lambda shard: _size_histogram(_iter_files(shard, '.mp3')), shards)
+        
+        total_size = sum(part[0] for part in parts)
+        total_files = sum(part[1] for part in parts)
+        buckets = [sum(counts) for counts in zip(*(part[2] for part in parts))]
+        
+        # Get file size distribution
+        size_ranges = dict(zip(_SIZE_LABELS, buckets))
+        
+        stats = {
+            "total_files": total_files,
             "total_size_mb": round(total_size / (1024 * 1024), 2),
             "size_distribution": size_ranges,
-            "average_size_mb": round(total_size / len(audio_files) / (1024 * 1024), 2) if audio_files else 0
+            "average_size_mb": round(total_size / total_files / (1024 * 1024), 2) if total_files else 0
         }
+        return stats, shards
+    
+    def _has_audio_files(self) -> bool:
+        """Whether any audio file exists, stopping at the first one found."""
+        if any(True for _ in _iter_files(self.dest_dir, '.mp3')):
+            return True
+        with os.scandir(self.dest_dir) as entries:
+            subdirs = [entry.path for entry in entries if entry.is_dir(follow_symlinks=False)]
+        if len(subdirs) <= _SHARD_THRESHOLD:
+            return False
+        return any(any(True for _ in _iter_files(subdir, '.mp3')) for subdir in subdirs)
     
     def get_playlist_stats(self) -> Dict:
         """Get playlist statistics."""
         if not self.playlists_dir.exists():
             return {"error": "Playlists directory not found"}
         
-        playlists = list(self.playlists_dir.rglob('*.m3u'))
+        playlists = list(_walk_files(self.playlists_dir, '.m3u'))
+        
+        # Track counts from the last run, reused for playlists whose mtime is unchanged
+        previous = self._load_cache().get('playlists', {})
         
-        playlist_info = []
-        for playlist in playlists:
+        def scan(playlist: os.DirEntry) -> Tuple[Dict, Optional[list]]:
             try:
-                with open(playlist, 'r', encoding='utf-8') as f:
-                    lines = f.readlines()
-                    # Count non-comment lines (actual tracks)
-                    track_count = len([line for line in lines if not line.startswith('#') and line.strip()])
-                    playlist_info.append({
-                        "name": playlist.name,
-                        "path": str(playlist.relative_to(self.playlists_dir)),
-                        "tracks": track_count
-                    })
+                mtime_ns = playlist.stat().st_mtime_ns
+                cached = previous.get(playlist.path)
+                if cached and cached[0] == mtime_ns:
+                    track_count = cached[1]
+                else:
+                    track_count = _count_playlist_tracks(playlist.path)
+                return {
+                    "name": playlist.name,
+                    "path": os.path.relpath(playlist.path, self.playlists_dir),
+                    "tracks": track_count
+                }, [mtime_ns, track_count]
             except Exception as e:
-                playlist_info.append({
+                return {
                     "name": playlist.name,
                     "error": str(e)
-                })
+                }, None
+        
+        results = _map_io(scan, playlists)
+        playlist_info = [info for info, _ in results]
+        counts = {playlist.path: record for playlist, (_, record) in zip(playlists, results) if record}
+        
+        if counts != previous:
+            self._set_section('playlists', counts)
         
         return {
             "total_playlists": len(playlists),
@@ -141,43 +399,33 @@ class Project5001Status:
         if not self.logs_dir.exists():
             return {"error": "Logs directory not found"}
         
-        log_files = list(self.logs_dir.glob('*.log'))
+        log_files = list(_iter_files(self.logs_dir, '.log'))
         
-        log_info = []
-        for log_file in log_files:
-            try:
-                stat = log_file.stat()
-                log_info.append({
-                    "name": log_file.name,
-                    "size_mb": round(stat.st_size / (1024 * 1024), 2),
-                    "modified": datetime.fromtimestamp(stat.st_mtime).isoformat()
-                })
-            except Exception as e:
-                log_info.append({
-                    "name": log_file.name,
-                    "error": str(e)
-                })
+        log_info = _map_io(_log_info, log_files)
         
         return {
             "total_logs": len(log_files),
             "logs": log_info
         }
     
-    def check_syncthing_status(self) -> Dict:
-        """Check Syncthing status."""
+    def check_syncthing_status(self, health: Optional[List[str]] = None) -> Dict:
+        """Check Syncthing status, appending to health if the connection failed."""
+        result = self._query_syncthing()
+        if health is not None and result['status'] == 'error':
+            health.append("Syncthing connection failed")
+        return result
+    
+    def _query_syncthing(self) -> Dict:
+        """Query the Syncthing REST API for its status."""
         try:
-            import requests
-            from dotenv import load_dotenv
-            load_dotenv()
-            
             api_url = os.getenv('SYNCTHING_API_URL')
             api_key = os.getenv('SYNCTHING_API_KEY')
             
             if not api_url or not api_key:
                 return {"status": "not_configured"}
             
-            headers = {'X-API-Key': api_key}
-            response = requests.get(f"{api_url}/rest/system/status", headers=headers, timeout=5)
+            session = _syncthing_session(api_key)
+            response = session.get(f"{api_url}/rest/system/status", timeout=5)
             
             if response.status_code == 200:
                 data = response.json()
@@ -192,20 +440,42 @@ class Project5001Status:
         except Exception as e:
             return {"status": "error", "message": str(e)}
     
-    def get_full_status(self) -> Dict:
-        """Get complete system status."""
-        return {
-            "timestamp": datetime.now().isoformat(),
-            "database": self.get_database_stats(),
-            "files": self.get_file_stats(),
-            "playlists": self.get_playlist_stats(),
-            "logs": self.get_log_stats(),
-            "syncthing": self.check_syncthing_status()
-        }
+    def get_full_status(self, health: Optional[List[str]] = None) -> Dict:
+        """Get complete system status, appending any issues found to health."""
+        timestamp = datetime.now().isoformat()
+        
+        # The subsections are independent, so collect them together; each
+        # gets its own issue list so health stays in a fixed order
+        issues = {name: [] for name in ('database', 'files', 'syncthing')}
+        collectors = [
+            ('database', lambda: self.get_database_stats(issues['database'])),
+            ('files', lambda: self.get_file_stats(issues['files'])),
+            ('playlists', self.get_playlist_stats),
+            ('logs', self.get_log_stats),
+            ('syncthing', lambda: self.check_syncthing_status(issues['syncthing']))
+        ]
+        with ThreadPoolExecutor(max_workers=len(collectors)) as executor:
+            futures = {name: executor.submit(collect) for name, collect in collectors}
+            status = {"timestamp": timestamp}
+            status.update((name, future.result()) for name, future in futures.items())
+        
+        if health is not None:
+            for section_issues in issues.values():
+                health.extend(section_issues)
+        return status
+    
+    def get_health(self) -> List[str]:
+        """List current issues without collecting the full statistics."""
+        issues = []
+        self.get_database_stats(issues, health_only=True)
+        self.get_file_stats(issues, health_only=True)
+        self.check_syncthing_status(issues)
+        return issues
     
     def print_status(self):
         """Print formatted status to console."""
-        status = self.get_full_status()
+        issues = []
+        status = self.get_full_status(issues)
         
         print("🎧 Project 5001 Status Report")
         print("=" * 50)
@@ -269,21 +539,6 @@ class Project5001Status:
         
         # Health summary
         print("🏥 Health Summary:")
-        issues = []
-        
-        if 'error' in db:
-            issues.append("Database not found")
-        elif db['total_tracks'] == 0:
-            issues.append("No tracks harvested")
-        
-        if 'error' in files:
-            issues.append("Harvest directory not found")
-        elif files['total_files'] == 0:
-            issues.append("No audio files found")
-        
-        if syncthing['status'] == 'error':
-            issues.append("Syncthing connection failed")
-        
         if issues:
             print("  ❌ Issues detected:")
             for issue in issues:
@@ -298,10 +553,19 @@ def main():
     status_checker = Project5001Status()
     
     import sys
-    if len(sys.argv) > 1 and sys.argv[1] == '--json':
+    if len(sys.argv) > 1 and sys.argv[1] == '--health':
+        # Only the issue list, for watchdog-style polling
+        issues = status_checker.get_health()
+        for issue in issues:
+            print(issue)
+        sys.exit(1 if issues else 0)
+    elif len(sys.argv) > 1 and sys.argv[1] == '--json':
         # Output JSON for programmatic use
-        import json
-        print(json.dumps(status_checker.get_full_status(), indent=2))
+        status = status_checker.get_full_status()
+        if orjson:
+            sys.stdout.buffer.write(orjson.dumps(status, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE))
+        else:
+            print(json.dumps(status, indent=2))
     else:
         # Print formatted status
         status_checker.print_status()
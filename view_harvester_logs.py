@@ -6,10 +6,11 @@ View harvester logs in real-time in a separate terminal window.
 
 import os
 import sys
-import time
 import signal
+import threading
 from pathlib import Path
 from datetime import datetime
+from harvester_manager import tail_lines, watch_directory
 
 def print_banner():
     """Print the log viewer banner."""
@@ -24,51 +25,59 @@ def follow_logs(log_file_path: str, lines: int = 10):
     """Follow logs in real-time."""
     log_file = Path(log_file_path)
     
-    if not log_file.exists():
+    # One handle serves both the initial tail and the follow loop
+    try:
+        f = open(log_file, 'rb')
+    except FileNotFoundError:
         print(f"❌ Log file not found: {log_file_path}")
         print("Make sure the harvester is running first.")
         return
     
-    print(f"📝 Following logs: {log_file_path}")
-    print(f"📊 Showing last {lines} lines, then following in real-time...")
-    print("-" * 80)
-    
-    # Show last N lines first
-    try:
-        with open(log_file, 'r', encoding='utf-8') as f:
-            all_lines = f.readlines()
-            if len(all_lines) > lines:
-                for line in all_lines[-lines:]:
-                    print(line.rstrip())
-            else:
-                for line in all_lines:
-                    print(line.rstrip())
-    except Exception as e:
-        print(f"❌ Error reading log file: {e}")
-        return
-    
-    print("-" * 80)
-    print("🔄 Following new log entries...")
-    print("-" * 80)
-    
-    # Follow new entries
-    try:
-        with open(log_file, 'r', encoding='utf-8') as f:
+    with f:
+        print(f"📝 Following logs: {log_file_path}")
+        print(f"📊 Showing last {lines} lines, then following in real-time...")
+        print("-" * 80)
+        
+        # Show last N lines first
+        try:
+            for line in tail_lines(f, lines):
+                print(line.rstrip())
+        except Exception as e:
+            print(f"❌ Error reading log file: {e}")
+            return
+        
+        print("-" * 80)
+        print("🔄 Following new log entries...")
+        print("-" * 80)
+        
+        # Block on file notifications when watchdog is available, otherwise poll
+        changed = threading.Event()
+        observer = watch_directory(log_file.parent, changed)
+        poll_interval = 5 if observer else 0.1
+        
+        # Follow new entries
+        try:
             # Go to end of file
-            f.seek(0, 2)
+            f.seek(0, os.SEEK_END)
+            if hasattr(os, 'posix_fadvise'):
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
             
             while True:
                 line = f.readline()
                 if line:
                     timestamp = datetime.now().strftime("%H:%M:%S")
-                    print(f"[{timestamp}] {line.rstrip()}")
+                    print(f"[{timestamp}] {line.decode('utf-8', errors='replace').rstrip()}")
                 else:
-                    time.sleep(0.1)
+                    changed.wait(poll_interval)
+                    changed.clear()
                     
-    except KeyboardInterrupt:
-        print("\n\n👋 Log viewer stopped by user")
-    except Exception as e:
-        print(f"\n❌ Error following logs: {e}")
+        except KeyboardInterrupt:
+            print("\n\n👋 Log viewer stopped by user")
+        except Exception as e:
+            print(f"\n❌ Error following logs: {e}")
+        finally:
+            if observer:
+                observer.stop()
 
 def check_harvester_status():
     """Check if harvester is running."""